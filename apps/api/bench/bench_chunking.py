@@ -0,0 +1,167 @@
+"""
+Benchmark: regex single-pass chunker (rag.chunking) vs the previous
+character-by-character implementation, on large synthetic documents.
+
+Run from apps/api:
+  python bench/bench_chunking.py [--chars 120000] [--repeat 20]
+
+Also asserts both produce identical Chunk lists.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rag.chunking import Chunk, chunk_document  # noqa: E402
+
+
+# ---- previous implementation (kept verbatim for comparison) ----
+def legacy_iter_paragraph_spans(text: str) -> List[tuple[int, int]]:
+    spans: List[tuple[int, int]] = []
+    n = len(text)
+    i = 0
+
+    while i < n:
+        while i < n and text[i] in ("\n", "\r"):
+            i += 1
+        if i >= n:
+            break
+
+        start = i
+        while i < n:
+            if text[i] == "\n":
+                j = i
+                j += 1
+                if j < n and text[j] == "\r":
+                    j += 1
+                if j < n and text[j] == "\n":
+                    end = i
+                    spans.append((start, end))
+                    i = j + 1
+                    break
+            i += 1
+        else:
+            spans.append((start, n))
+            break
+
+    return spans
+
+
+def legacy_chunk_document(document_text: str, *, max_chars: int = 900, overlap_chars: int = 150) -> List[Chunk]:
+    if not document_text or not document_text.strip():
+        return []
+
+    chunks: List[Chunk] = []
+    spans = legacy_iter_paragraph_spans(document_text)
+
+    buf_start = None
+    buf_end = None
+    chunk_idx = 0
+
+    def flush():
+        nonlocal chunk_idx, buf_start, buf_end
+        if buf_start is None or buf_end is None:
+            return
+        text = document_text[buf_start:buf_end]
+        if text.strip():
+            chunks.append(Chunk(chunk_id=f"c{chunk_idx:04d}", start=buf_start, end=buf_end, text=text))
+            chunk_idx += 1
+        buf_start = None
+        buf_end = None
+
+    for (p_start, p_end) in spans:
+        para = document_text[p_start:p_end].strip()
+        if not para:
+            continue
+
+        if (p_end - p_start) > max_chars:
+            flush()
+            w_start = p_start
+            while w_start < p_end:
+                w_end = min(p_end, w_start + max_chars)
+                nl = document_text.rfind("\n", w_start, w_end)
+                if nl != -1 and nl > w_start + 200:
+                    w_end = nl
+                chunks.append(Chunk(chunk_id=f"c{chunk_idx:04d}", start=w_start, end=w_end, text=document_text[w_start:w_end]))
+                chunk_idx += 1
+                w_start = max(w_end - overlap_chars, w_start + 1)
+            continue
+
+        if buf_start is None:
+            buf_start = p_start
+            buf_end = p_end
+        else:
+            tentative_len = (p_end - buf_start)
+            if tentative_len > max_chars:
+                flush()
+                buf_start = p_start
+                buf_end = p_end
+            else:
+                buf_end = p_end
+
+    flush()
+    return chunks
+
+
+# ---- synthetic documents ----
+_WORDS = "the contract party shall agreement section clause payment term notice law vancouver data".split()
+
+
+def make_document(n_chars: int, *, seed: int = 0, long_paragraphs: bool = False, crlf: bool = False) -> str:
+    rng = random.Random(seed)
+    nl = "\r\n" if crlf else "\n"
+    parts: List[str] = []
+    size = 0
+    while size < n_chars:
+        n_sent = rng.randint(8, 40) if long_paragraphs else rng.randint(1, 6)
+        sents = []
+        for _ in range(n_sent):
+            sents.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 20))).capitalize() + ".")
+        para = (nl if rng.random() < 0.2 else " ").join(sents)
+        parts.append(para)
+        size += len(para) + 2
+    seps = [nl + nl, nl + nl + nl, nl + "  " + nl + nl]
+    out = parts[0]
+    for p in parts[1:]:
+        out += rng.choice(seps) + p
+    return out[:n_chars]
+
+
+def _time(fn: Callable[[str], List[Chunk]], doc: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(doc)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=120_000)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    cases = {
+        "short paragraphs": make_document(args.chars, seed=1),
+        "long paragraphs": make_document(args.chars, seed=2, long_paragraphs=True),
+        "crlf": make_document(args.chars, seed=3, crlf=True),
+    }
+
+    print(f"{'case':<18} {'chunks':>7} {'legacy ms':>10} {'new ms':>8} {'speedup':>8}")
+    for name, doc in cases.items():
+        old, new = legacy_chunk_document(doc), chunk_document(doc)
+        assert old == new, f"{name}: chunk mismatch"
+        t_old = _time(legacy_chunk_document, doc, args.repeat)
+        t_new = _time(chunk_document, doc, args.repeat)
+        print(f"{name:<18} {len(new):>7} {t_old:>10.2f} {t_new:>8.2f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
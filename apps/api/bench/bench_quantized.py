@@ -0,0 +1,81 @@
+"""
+Benchmark: float32 vs float16 / int8 (QuantizedMatrix) document matrices.
+
+Reports memory, per-query scoring latency, and recall@k of the approximate
+top-k (without re-ranking) and after exact re-ranking of k * rerank_factor
+candidates, against the exact float32 top-k. The re-rank reads the exact
+tier (QuantizedMatrix.exact, the disk mmap in the service); without a disk
+store the service serves the "recall" column.
+
+Run from apps/api:
+  python bench/bench_quantized.py [--n 20000] [--queries 200] [--k 5]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rag.quantize import QuantizedMatrix  # noqa: E402
+from rag.retrieval import _top_k  # noqa: E402
+
+
+def make_corpus(n: int, d: int, *, seed: int = 0) -> np.ndarray:
+    """Clustered, L2-normalized vectors (closer to real chunk embeddings than iid noise)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 200), d)).astype(np.float32)
+    mat = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, d)).astype(np.float32)
+    return mat / np.linalg.norm(mat, axis=1, keepdims=True)
+
+
+def make_queries(mat: np.ndarray, m: int, *, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = mat[rng.integers(0, len(mat), m)] + 0.5 * rng.standard_normal((m, mat.shape[1])).astype(np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20_000)
+    ap.add_argument("--d", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--rerank-factor", type=int, default=4)
+    args = ap.parse_args()
+
+    mat = make_corpus(args.n, args.d)
+    queries = make_queries(mat, args.queries)
+    truth = [set(_top_k(mat @ q, args.k).tolist()) for q in queries]
+
+    t0 = time.perf_counter()
+    for q in queries:
+        _top_k(mat @ q, args.k)
+    base_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    print(f"n={args.n} d={args.d} k={args.k} rerank_factor={args.rerank_factor}")
+    print(f"{'storage':<8} {'MB':>7} {'ms/query':>9} {'recall':>7} {'recall+rerank':>14}")
+    print(f"{'float32':<8} {mat.nbytes / 2**20:>7.1f} {base_ms:>9.3f} {1.0:>7.3f} {1.0:>14.3f}")
+
+    for kind in ("float16", "int8"):
+        qm = QuantizedMatrix.from_float32(mat, kind, exact=mat)
+        n_cand = args.k * args.rerank_factor
+        hit_raw = hit_rr = 0
+        t0 = time.perf_counter()
+        for q, want in zip(queries, truth):
+            approx = qm @ q
+            hit_raw += len(want & set(_top_k(approx, args.k).tolist()))
+            cand = _top_k(approx, n_cand)
+            exact = qm.exact_rows(cand) @ q  # exact rows for the shortlist only
+            hit_rr += len(want & set(cand[_top_k(exact, args.k)].tolist()))
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        total = args.k * len(queries)
+        print(f"{kind:<8} {qm.nbytes / 2**20:>7.1f} {ms:>9.3f} {hit_raw / total:>7.3f} {hit_rr / total:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
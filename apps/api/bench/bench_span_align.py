@@ -0,0 +1,230 @@
+"""
+Benchmark: indexed span alignment (rag.span_align) vs the previous
+SequenceMatcher-based implementation, on realistic sentence/chunk pairs:
+
+  verbatim     a sentence copied from the chunk
+  paraphrase   same sentence with words dropped / swapped (typical LLM restating)
+  merged       halves of two sentences from the chunk
+  unrelated    a sentence from a different chunk
+
+Reports per-call latency, the accept rate at verify_min, agreement with
+the legacy decision and with the label (verbatim and paraphrase are
+supported; merged, a recombination of two facts, and unrelated are not),
+and overlap (IoU) of the returned spans. Paraphrases swap in random
+vocabulary words, often ones the chunk uses elsewhere, so some read as
+recombinations and are rejected.
+The legacy aligner places its window on the first occurrence of each
+keyword, so on long chunks it rejects most verbatim sentences; agreement
+with it is informative for "unrelated" only. tests/test_span_align.py
+checks decisions on real English sentences against the legacy scores.
+
+Run from apps/api:
+  python bench/bench_span_align.py [--pairs 400] [--chunk-chars 900] [--verify-min 0.40]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rag.span_align import ChunkSpanIndex, align_span  # noqa: E402
+
+Span = Optional[Tuple[int, int, float]]
+
+
+# ---- previous implementation (kept verbatim for comparison) ----
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+def _keywords(s: str) -> list[str]:
+    words = [w.lower() for w in _WORD_RE.findall(s)]
+    # Keep useful words
+    words = [w for w in words if len(w) >= 4]
+    # de-dup preserving order
+    seen = set()
+    out = []
+    for w in words:
+        if w not in seen:
+            out.append(w)
+            seen.add(w)
+    return out[:10]
+
+def legacy_align_span(sentence: str, chunk_text: str) -> Optional[Tuple[int, int, float]]:
+    s = (sentence or "").strip()
+    c = (chunk_text or "")
+    if not s or not c:
+        return None
+
+    s_low = s.lower()
+    c_low = c.lower()
+
+    # 1) Keyword hit region
+    keys = _keywords(s)
+    hits = []
+    for k in keys:
+        idx = c_low.find(k)
+        if idx != -1:
+            hits.append((idx, idx + len(k)))
+
+    if len(hits) >= 2:
+        start = min(a for a, _ in hits)
+        end = max(b for _, b in hits)
+        # Expand slightly to include context
+        start = max(0, start - 40)
+        end = min(len(c), end + 40)
+        # Score using fuzzy ratio on that window
+        win = c[start:end]
+        score = SequenceMatcher(None, s_low, win.lower()).ratio()
+        return (start, end, score)
+
+    # 2) If sentence (or a big fragment) is literally inside chunk
+    if len(s_low) >= 20:
+        j = c_low.find(s_low[: min(len(s_low), 80)])
+        if j != -1:
+            start = max(0, j - 20)
+            end = min(len(c), j + min(len(s_low), 140))
+            win = c[start:end]
+            score = SequenceMatcher(None, s_low, win.lower()).ratio()
+            return (start, end, score)
+
+    # 3) Fuzzy sliding window fallback (bounded cost)
+    # Take a window ~ 1.4x sentence length, scan a few positions
+    target_len = max(80, int(len(s) * 1.4))
+    if target_len >= len(c):
+        score = SequenceMatcher(None, s_low, c_low).ratio()
+        return (0, len(c), score)
+
+    best = (0, target_len, 0.0)
+    step = max(40, target_len // 6)
+    for start in range(0, len(c) - target_len, step):
+        end = start + target_len
+        win = c_low[start:end]
+        sc = SequenceMatcher(None, s_low, win).ratio()
+        if sc > best[2]:
+            best = (start, end, sc)
+
+    return best
+
+
+# ---- realistic-ish pairs ----
+_SYLLABLES = "ka ren tor li mo sa vel dun pri ost ex an tra cor mel in ter fa gu lo".split()
+_FUNCTION = "the a of to and in for is that on with by as be this are or at from".split()
+
+
+def _vocab(rng: random.Random, n: int = 600) -> List[str]:
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def _sentence(rng: random.Random, vocab: List[str]) -> List[str]:
+    # Zipf(1) content words mixed with function words
+    weights = [1.0 / (r + 1) for r in range(len(vocab))]
+    n = rng.randint(8, 28)
+    content = rng.choices(vocab, weights=weights, k=n)
+    return [rng.choice(_FUNCTION) if rng.random() < 0.35 else w for w in content]
+
+
+def _chunk(rng: random.Random, vocab: List[str], n_chars: int) -> Tuple[str, List[List[str]]]:
+    sents: List[List[str]] = []
+    size = 0
+    while size < n_chars:
+        s = _sentence(rng, vocab)
+        sents.append(s)
+        size += sum(len(w) + 1 for w in s) + 1
+    return " ".join(" ".join(s).capitalize() + "." for s in sents), sents
+
+
+def _paraphrase(rng: random.Random, words: List[str], vocab: List[str]) -> List[str]:
+    out = []
+    for w in words:
+        r = rng.random()
+        if r < 0.15:
+            continue
+        out.append(rng.choice(vocab) if r < 0.30 else w)
+    return out or words
+
+
+def make_pairs(n: int, chunk_chars: int, *, seed: int = 0) -> List[Tuple[str, str, str]]:
+    rng = random.Random(seed)
+    vocab = _vocab(rng)
+    pairs: List[Tuple[str, str, str]] = []
+    kinds = ("verbatim", "paraphrase", "merged", "unrelated")
+    for i in range(n):
+        kind = kinds[i % len(kinds)]
+        text, sents = _chunk(rng, vocab, chunk_chars)
+        s = rng.choice(sents)
+        if kind == "paraphrase":
+            s = _paraphrase(rng, s, vocab)
+        elif kind == "merged":
+            t = rng.choice(sents)
+            s = s[: len(s) // 2] + t[len(t) // 2:]
+        elif kind == "unrelated":
+            s = rng.choice(_chunk(rng, vocab, chunk_chars)[1])
+        pairs.append((kind, " ".join(s).capitalize() + ".", text))
+    return pairs
+
+
+def _iou(a: Span, b: Span) -> float:
+    if a is None or b is None:
+        return float(a is b)
+    inter = max(0, min(a[1], b[1]) - max(a[0], b[0]))
+    union = max(a[1], b[1]) - min(a[0], b[0])
+    return inter / union if union else 1.0
+
+
+def _time(fn: Callable[[str, str], Span], pairs: List[Tuple[str, str, str]], repeat: int) -> Tuple[float, List[Span]]:
+    best = float("inf")
+    out: List[Span] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = [fn(s, c) for _, s, c in pairs]
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / len(pairs), out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=400)
+    ap.add_argument("--chunk-chars", type=int, default=900)
+    ap.add_argument("--verify-min", type=float, default=0.40)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pairs = make_pairs(args.pairs, args.chunk_chars)
+    indexes = {c: ChunkSpanIndex(c) for _, _, c in pairs}
+
+    legacy_us, legacy = _time(legacy_align_span, pairs, args.repeat)
+    new_us, new = _time(align_span, pairs, args.repeat)
+    idx_us, _ = _time(lambda s, c: align_span(s, c, index=indexes[c]), pairs, args.repeat)
+
+    print(f"pairs={len(pairs)} chunk_chars~{args.chunk_chars} verify_min={args.verify_min}")
+    print(f"{'impl':<22} {'us/call':>9}")
+    print(f"{'legacy SequenceMatcher':<22} {legacy_us:>9.1f}")
+    print(f"{'indexed (build index)':<22} {new_us:>9.1f}  ({legacy_us / new_us:.1f}x)")
+    print(f"{'indexed (prebuilt)':<22} {idx_us:>9.1f}  ({legacy_us / idx_us:.1f}x)")
+
+    by_kind: Dict[str, List[Tuple[Span, Span]]] = {}
+    for (kind, _, _), a, b in zip(pairs, legacy, new):
+        by_kind.setdefault(kind, []).append((a, b))
+    print(f"\n{'kind':<11} {'legacy acc':>10} {'new acc':>8} {'agree':>6} {'label ok':>9} {'span IoU':>9} {'legacy score':>13} {'new score':>10}")
+    for kind, rows in by_kind.items():
+        acc_a = sum(a[2] >= args.verify_min for a, _ in rows) / len(rows)
+        acc_b = sum(b[2] >= args.verify_min for _, b in rows) / len(rows)
+        agree = sum((a[2] >= args.verify_min) == (b[2] >= args.verify_min) for a, b in rows) / len(rows)
+        label_ok = acc_b if kind in ("verbatim", "paraphrase") else 1.0 - acc_b
+        iou = sum(_iou(a, b) for a, b in rows) / len(rows)
+        sa = sum(a[2] for a, _ in rows) / len(rows)
+        sb = sum(b[2] for _, b in rows) / len(rows)
+        print(f"{kind:<11} {acc_a:>10.2f} {acc_b:>8.2f} {agree:>6.2f} {label_ok:>9.2f} {iou:>9.2f} {sa:>13.3f} {sb:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,52 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
 import time
-from typing import Dict, List
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from typing import Annotated, Any, AsyncIterator, Awaitable, Dict, List, Optional, Set, Tuple
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
 
 from rag.embeddings import Embedder
-from rag.retrieval import DocIndexCache, retrieve_top_k
-from rag.answering import evidence_only_answer, generate_verified_answer
-from rag.guardrails import sanitize_question, sanitize_document
+from rag.batching import BatchingEmbedder
+from rag.embed_cache import ChunkEmbeddingCache
+from rag.retrieval import DocIndexCache, Retrieved, retrieve_top_k, retrieve_top_k_batch
+from rag.index_store import DiskIndexStore
+from rag.corpus import Corpus
+from rag.documents import DocumentRegistry, document_handle
+from rag.answer_cache import SemanticAnswerCache
+from rag.answering import AnswerOut, VerifiedAnswerStream, evidence_only_answer, generate_verified_answer_async
+from rag.admission import Admission, Overloaded, StageLimiter
+from rag.aio import run_cpu, shutdown_cpu_executor
+from rag.gen_cache import GenerationCache
+from rag.backends import OllamaBackendPool, load_backend_urls
+from rag.guardrails import Sanitized, sanitize_question, sanitize_document
+from rag.metrics import METRICS, Sample, stage
+from rag.tracing import JsonlSpanSink, SpanRecorder, span, start_recording
+from rag.verify import VerifiedSentence, shutdown_verify_executor
 
-app = FastAPI(title="TrustCite API", version="0.2.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_cpu(CORPUS.load, EMBEDDER)
+    yield
+    await OLLAMA.aclose()
+    if isinstance(EMBEDDER, BatchingEmbedder):
+        EMBEDDER.close()
+    shutdown_cpu_executor()
+    shutdown_verify_executor()
+    if TRACE_SINK is not None:
+        TRACE_SINK.close()
+
+
+app = FastAPI(title="TrustCite API", version="0.2.0", lifespan=lifespan)
 
 # ---- CORS (Day 6: deploy-friendly) ----
 # Example: TRUSTCITE_CORS_ORIGINS="http://localhost:3000,https://your.vercel.app"
@@ -31,6 +64,7 @@ class Citation(BaseModel):
     chunk_id: str
     start: int
     end: int
+    doc_id: Optional[str] = None  # corpus mode only
 
 
 class AnswerSentence(BaseModel):
@@ -38,14 +72,38 @@ class AnswerSentence(BaseModel):
     citations: List[Citation] = Field(default_factory=list)
 
 
-class AskRequest(BaseModel):
+class DocumentSource(BaseModel):
+    # exactly one of: the full text, or a handle from POST /documents
+    document_text: Optional[str] = Field(default=None, min_length=1)
+    doc_handle: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_document_source(self):
+        if (self.document_text is None) == (self.doc_handle is None):
+            raise ValueError("provide exactly one of document_text or doc_handle")
+        return self
+
+
+class AskRequest(DocumentSource):
     question: str = Field(min_length=1)
+    debug: bool = False  # return per-stage spans in trace.spans
+
+
+class DocumentUploadRequest(BaseModel):
     document_text: str = Field(min_length=1)
 
 
+class DocumentUploadResponse(BaseModel):
+    doc_handle: str
+    chunks: int
+    chars: int
+
+
 class RetrievedChunk(BaseModel):
     chunk_id: str
     score: float
+    lexical: float = 0.0
+    doc_id: Optional[str] = None
 
 
 class ChunkPreview(BaseModel):
@@ -54,6 +112,7 @@ class ChunkPreview(BaseModel):
     start: int
     end: int
     text: str
+    doc_id: Optional[str] = None
 
 
 class Trace(BaseModel):
@@ -67,6 +126,11 @@ class Trace(BaseModel):
     dropped_sentences: int = 0
     verification_scores: List[float] = Field(default_factory=list)
     sanitized: Dict[str, bool] = Field(default_factory=lambda: {"question": False, "document": False})
+    cache_hits: Dict[str, bool] = Field(default_factory=dict)  # e.g. {"generation": true}
+    deadline_hit: bool = False  # SLO mode: generation overran, evidence-only answer returned
+    queue: Dict[str, Dict[str, float]] = Field(default_factory=dict)  # per stage: {"wait_ms", "depth"} on arrival
+    shed: Optional[Dict[str, Any]] = None  # /ask/batch: this question was shed by a stage ({"stage", "status", "retry_after_s"})
+    spans: Optional[List[Dict[str, Any]]] = None  # debug only: nested timed spans, microseconds from request start
 
 
 class AskResponse(BaseModel):
@@ -75,71 +139,530 @@ class AskResponse(BaseModel):
     trace: Trace
 
 
+class AskBatchRequest(DocumentSource):
+    questions: List[Annotated[str, Field(min_length=1)]] = Field(min_length=1, max_length=64)
+
+
+class AskBatchResponse(BaseModel):
+    results: List[AskResponse]  # same order as questions
+    timings_ms: Dict[str, int]
+
+
+class CorpusIngestRequest(BaseModel):
+    document_text: str = Field(min_length=1)
+    doc_id: Optional[str] = Field(default=None, pattern=r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+class CorpusIngestResponse(BaseModel):
+    doc_id: str
+    chunks: int
+
+
+class CorpusAskRequest(BaseModel):
+    question: str = Field(min_length=1)
+    top_k: int = Field(default=5, ge=1, le=20)
+    debug: bool = False
+
+
 # ---- Singletons ----
-EMBEDDER = Embedder.load("sentence-transformers/all-MiniLM-L6-v2")
-CACHE = DocIndexCache(max_items=8)
+# Query embeddings from concurrent requests are micro-batched (0 ms wait = off)
+QUERY_BATCH_WAIT_MS = float(os.getenv("TRUSTCITE_QUERY_BATCH_WAIT_MS", "2"))
+# Content-addressed chunk embedding cache shared by all documents (0 MB = off)
+CHUNK_CACHE_MB = float(os.getenv("TRUSTCITE_CHUNK_CACHE_MB", "64"))
+CHUNK_CACHE = ChunkEmbeddingCache(max_bytes=int(CHUNK_CACHE_MB * 1024 * 1024)) if CHUNK_CACHE_MB > 0 else None
+EMBEDDER = Embedder.load("sentence-transformers/all-MiniLM-L6-v2", text_cache=CHUNK_CACHE)
+if QUERY_BATCH_WAIT_MS > 0:
+    EMBEDDER = BatchingEmbedder(
+        EMBEDDER,
+        max_batch=int(os.getenv("TRUSTCITE_QUERY_BATCH_MAX", "32")),
+        max_wait_ms=QUERY_BATCH_WAIT_MS,
+    )
+# Hybrid retrieval (opt-in): BM25 fused with dense scores ("rrf" | "weighted" | "none")
+FUSION = os.getenv("TRUSTCITE_FUSION", "none").strip().lower()
+FUSION = None if FUSION in ("", "none") else FUSION
+# Lexical escape from abstention (opt-in, needs FUSION): 0 = cosine gate only
+LEXICAL_MIN = float(os.getenv("TRUSTCITE_LEXICAL_MIN", "0"))
+# Optional persistent index tier, e.g. TRUSTCITE_INDEX_DIR="/var/lib/trustcite/index"
+INDEX_DIR = os.getenv("TRUSTCITE_INDEX_DIR", "").strip()
+CACHE_TTL_S = float(os.getenv("TRUSTCITE_CACHE_TTL_S", "0"))
+# at most TRUSTCITE_INDEX_MAX_ITEMS documents on disk (0 = unbounded), least recently used pruned first
+INDEX_STORE = DiskIndexStore(INDEX_DIR, max_items=int(os.getenv("TRUSTCITE_INDEX_MAX_ITEMS", "10000"))) if INDEX_DIR else None
+CACHE = DocIndexCache(
+    max_items=int(os.getenv("TRUSTCITE_CACHE_MAX_ITEMS", "8")),
+    max_bytes=int(float(os.getenv("TRUSTCITE_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    ttl_s=CACHE_TTL_S or None,
+    storage=os.getenv("TRUSTCITE_EMBED_STORAGE", "float32"),  # float32 | float16 | int8
+    hybrid=FUSION is not None,
+    store=INDEX_STORE,
+)
+# Uploaded documents by handle (POST /documents), LRU by total characters; with
+# TRUSTCITE_INDEX_DIR the text is saved there too, so every worker resolves every handle
+DOCUMENTS = DocumentRegistry(
+    max_chars=int(float(os.getenv("TRUSTCITE_DOCUMENTS_MAX_MB", "64")) * 1024 * 1024), store=INDEX_STORE
+)
+# /ask/batch: max questions generating at once per batch request
+BATCH_CONCURRENCY = int(os.getenv("TRUSTCITE_BATCH_CONCURRENCY", "4"))
+# Multi-document corpus (ANN index); persisted when TRUSTCITE_CORPUS_DIR is set
+CORPUS_DIR = os.getenv("TRUSTCITE_CORPUS_DIR", "").strip()
+CORPUS = Corpus(CORPUS_DIR or None, n_probe=int(os.getenv("TRUSTCITE_CORPUS_NPROBE", "16")))
+# Prompt token budget: evidence is packed by rank to fit and num_ctx is sized
+# to the budget with 25% headroom (1536 -> 4096; <= 1229 -> 2048)
+# (0 = legacy: every chunk at 900 chars, num_ctx 4096)
+PROMPT_BUDGET = int(os.getenv("TRUSTCITE_PROMPT_BUDGET_TOKENS", "1536")) or None
+# LLM response cache keyed by hash(model, options, prompt) (0 items = off)
+GEN_CACHE_ITEMS = int(os.getenv("TRUSTCITE_GEN_CACHE_ITEMS", "1024"))
+GEN_CACHE = GenerationCache(
+    GEN_CACHE_ITEMS,
+    root=os.getenv("TRUSTCITE_GEN_CACHE_DIR", "").strip() or None,
+    ttl_s=float(os.getenv("TRUSTCITE_GEN_CACHE_TTL_S", "0")) or None,
+    max_disk_items=int(os.getenv("TRUSTCITE_GEN_CACHE_DISK_ITEMS", "100000")),
+) if GEN_CACHE_ITEMS > 0 else None
+# Opt-in: verified answers reused for near-duplicate questions on the same document
+# (query cosine >= TRUSTCITE_ANSWER_CACHE_MIN and identical retrieved chunks; 0 docs = off).
+# Embeddings barely separate a question from its negation, so this trades exactness for latency.
+ANSWER_CACHE_DOCS = int(os.getenv("TRUSTCITE_ANSWER_CACHE_DOCS", "0"))
+ANSWER_CACHE = SemanticAnswerCache(
+    threshold=float(os.getenv("TRUSTCITE_ANSWER_CACHE_MIN", "0.90")),
+    max_docs=ANSWER_CACHE_DOCS,
+    max_per_doc=int(os.getenv("TRUSTCITE_ANSWER_CACHE_PER_DOC", "256")),
+) if ANSWER_CACHE_DOCS > 0 else None
+
+# Latency SLO (0 = off): past this many ms since the request started, /ask returns
+# the evidence-only answer instead of waiting for the LLM. The overrunning
+# generation is detached (it still fills the generation cache) or cancelled.
+# Detached generations keep their generate-stage slot, so at most half the
+# stage's slots are ever held by them (see _detach_cap).
+SLO_MS = float(os.getenv("TRUSTCITE_SLO_MS", "0"))
+SLO_DETACH = os.getenv("TRUSTCITE_SLO_DETACH", "1").strip().lower() not in ("0", "false", "no")
+SLO_MAX_DETACHED = int(os.getenv("TRUSTCITE_SLO_MAX_DETACHED", "8"))
+_DETACHED: Set["asyncio.Task[AnswerOut]"] = set()
+
+# Generation backends: one or more Ollama servers (OLLAMA_BASE_URLS), each with a pooled
+# keep-alive connection set; requests go to the least-loaded healthy one
+OLLAMA = OllamaBackendPool(
+    load_backend_urls(),
+    max_inflight=int(os.getenv("OLLAMA_MAX_INFLIGHT", "8")),
+    fail_threshold=int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "2")),
+    eject_s=float(os.getenv("OLLAMA_EJECT_S", "10")),
+)
+
+# Span tracing: requests with "debug": true get their spans in trace.spans; with a
+# trace file set, every /ask, /ask/stream and /corpus/ask is recorded there (JSONL)
+_TRACE_FILE = os.getenv("TRUSTCITE_TRACE_FILE", "").strip()
+TRACE_SINK = JsonlSpanSink(_TRACE_FILE) if _TRACE_FILE else None
+
+# Admission control: requests inside each stage at once (0 = unlimited), each with a
+# bounded wait queue. A full queue is rejected at once (429), a wait past
+# TRUSTCITE_QUEUE_WAIT_MS with 503; both carry Retry-After.
+_QUEUE_MAX = int(os.getenv("TRUSTCITE_QUEUE_MAX", "64"))
+_QUEUE_WAIT_S = float(os.getenv("TRUSTCITE_QUEUE_WAIT_MS", "5000")) / 1000.0
+EMBED_STAGE = StageLimiter(
+    "embed", int(os.getenv("TRUSTCITE_EMBED_CONCURRENCY", "8")), max_queue=_QUEUE_MAX, max_wait_s=_QUEUE_WAIT_S
+)
+# The generate stage admits no more than the backends can run at once (backends x
+# OLLAMA_MAX_INFLIGHT, the default); past that, requests would wait inside the pool,
+# where the queue is not bounded, traced or answered with Retry-After
+_BACKEND_SLOTS = len(OLLAMA.backends) * OLLAMA.max_inflight if OLLAMA.max_inflight > 0 else 0
+_generate_limit = int(os.getenv("TRUSTCITE_GENERATE_CONCURRENCY", "") or _BACKEND_SLOTS)
+if _BACKEND_SLOTS and (_generate_limit <= 0 or _generate_limit > _BACKEND_SLOTS):
+    _generate_limit = _BACKEND_SLOTS
+GENERATE_STAGE = StageLimiter("generate", _generate_limit, max_queue=_QUEUE_MAX, max_wait_s=_QUEUE_WAIT_S)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status,
+        content={"detail": f"overloaded ({exc})"},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
+
+def _trace_chunks(retrieved: List[Retrieved]) -> Tuple[List[RetrievedChunk], List[ChunkPreview]]:
+    trace_retrieved = [RetrievedChunk(chunk_id=r.chunk.chunk_id, score=r.score, lexical=r.lexical) for r in retrieved]
+    trace_preview = [
+        ChunkPreview(
+            chunk_id=r.chunk.chunk_id,
+            score=r.score,
+            start=r.chunk.start,
+            end=r.chunk.end,
+            text=r.chunk.text[:600],
+        )
+        for r in retrieved
+    ]
+    return trace_retrieved, trace_preview
+
+
+def _weak_evidence(retrieved: List[Retrieved], retrieve_min: float) -> bool:
+    """
+    Abstain when no chunk clears the cosine bar AND (with LEXICAL_MIN set)
+    none contains most of the question's rare terms (exact identifiers /
+    clause numbers embed poorly).
+    """
+    if not retrieved:
+        return True
+    if max(r.score for r in retrieved) >= retrieve_min:
+        return False
+    return LEXICAL_MIN <= 0 or max(r.lexical for r in retrieved) < LEXICAL_MIN
+
+
+async def _resolve_document(req: DocumentSource) -> Tuple[str, Optional[str]]:
+    """(document_text, cache key or None). Unknown / evicted handle -> 404 (re-upload)."""
+    if req.doc_handle is None:
+        return req.document_text, None
+    text = DOCUMENTS.get(req.doc_handle)
+    if text is None and DOCUMENTS.store is not None:
+        text = await run_cpu(DOCUMENTS.load, req.doc_handle)  # uploaded via another worker, or evicted here
+    if text is None:
+        raise HTTPException(status_code=404, detail="unknown doc_handle; upload the document again via /documents")
+    return text, req.doc_handle
+
+
+def _is_refused(raw_question: str, q_san: Sanitized) -> bool:
+    attack_terms = ["system prompt", "ignore", "developer message"]
+    return q_san.changed and any(t in raw_question.lower() for t in attack_terms)
+
+
+def _refused_response(t0: float, retrieve_min: float) -> AskResponse:
+    t1 = time.perf_counter()
+    return AskResponse(
+        answer=[],
+        abstained=True,
+        trace=Trace(
+            retrieved=[],
+            chunks_preview=[],
+            thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
+            timings_ms={"total": int((t1 - t0) * 1000)},
+            fallback_used=False,
+            dropped_sentences=0,
+            verification_scores=[],
+            sanitized={"question": True, "document": False},
+        ),
+    )
+
+
+def _record(endpoint: str, abstained: bool, trace: Trace) -> None:
+    """Outcome counters + end-to-end latency of one answer, for /metrics."""
+    outcome = "fallback" if trace.fallback_used else "abstained" if abstained else "answered"
+    METRICS.inc("trustcite_answers_total", endpoint=endpoint, outcome=outcome)
+    if trace.dropped_sentences:
+        METRICS.inc("trustcite_dropped_sentences_total", trace.dropped_sentences, endpoint=endpoint)
+    if trace.deadline_hit:
+        METRICS.inc("trustcite_deadline_hits_total", endpoint=endpoint)
+    if "total" in trace.timings_ms:
+        METRICS.observe("trustcite_request_seconds", trace.timings_ms["total"] / 1000, endpoint=endpoint)
+
+
+def _start_spans(name: str, debug: bool) -> Optional[SpanRecorder]:
+    return start_recording(name) if debug or TRACE_SINK is not None else None
+
+
+def _finish_spans(rec: Optional[SpanRecorder], abstained: bool, trace: Trace, debug: bool) -> None:
+    if rec is None:
+        return
+    if debug:
+        trace.spans = rec.export()
+    if TRACE_SINK is not None:
+        TRACE_SINK.write(rec, abstained=abstained, fallback_used=trace.fallback_used)  # queued; a thread appends
+
+
+def _recorded(endpoint: str, resp: AskResponse) -> AskResponse:
+    _record(endpoint, resp.abstained, resp.trace)
+    return resp
+
+
+def _metric_samples() -> List[Sample]:
+    """Values owned by the caches / limiters / backend pool, read at scrape time."""
+    out: List[Sample] = []
+    caches = {"doc_index": CACHE, "chunk_embedding": CHUNK_CACHE, "generation": GEN_CACHE, "answer": ANSWER_CACHE}
+    for name, c in caches.items():
+        if c is None:
+            continue
+        st = c.stats()
+        out.append(("trustcite_cache_hits_total", "counter", {"cache": name}, st["hits"]))
+        out.append(("trustcite_cache_misses_total", "counter", {"cache": name}, st["misses"]))
+    for limiter in (EMBED_STAGE, GENERATE_STAGE):
+        st = limiter.stats()
+        out.append(("trustcite_queue_depth", "gauge", {"stage": limiter.name}, st["queued"]))
+        out.append(("trustcite_stage_active", "gauge", {"stage": limiter.name}, st["active"]))
+    for b in OLLAMA.stats():
+        out.append(("trustcite_backend_healthy", "gauge", {"url": b["url"]}, int(b["healthy"])))
+        out.append(("trustcite_backend_inflight", "gauge", {"url": b["url"]}, b["inflight"]))
+    return out
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(METRICS.render(_metric_samples()), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
 def health():
-    return {"ok": True, "version": "0.2.0"}
+    return {
+        "ok": True,
+        "version": "0.2.0",
+        "doc_cache": CACHE.stats(),
+        "index_store": INDEX_STORE.stats() if INDEX_STORE is not None else None,
+        "chunk_cache": CHUNK_CACHE.stats() if CHUNK_CACHE is not None else None,
+        "gen_cache": GEN_CACHE.stats() if GEN_CACHE is not None else None,
+        "answer_cache": ANSWER_CACHE.stats() if ANSWER_CACHE is not None else None,
+        "documents": DOCUMENTS.stats(),
+        "corpus": CORPUS.stats(),
+        "ollama_backends": OLLAMA.stats(),
+        "admission": {"embed": EMBED_STAGE.stats(), "generate": GENERATE_STAGE.stats()},
+    }
+
+
+@app.post("/documents", response_model=DocumentUploadResponse)
+async def upload_document(req: DocumentUploadRequest):
+    """
+    Upload + index a document once; /ask and /ask/stream then take
+    {"question": ..., "doc_handle": ...} instead of the full text.
+    """
+    handle = await run_cpu(DOCUMENTS.put, req.document_text)
+    async with EMBED_STAGE.slot():
+        entry = await run_cpu(CACHE.get_entry, req.document_text, EMBEDDER, key=handle)
+    return DocumentUploadResponse(doc_handle=handle, chunks=len(entry.chunks), chars=len(req.document_text))
 
 
 @app.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest):
+async def ask(req: AskRequest):
     t0 = time.perf_counter()
+    rec = _start_spans("ask", req.debug)
 
     # Question sanitation affects what we embed / retrieve with
     q_san = sanitize_question(req.question)
     question = q_san.text
     # IMPORTANT: keep RAW doc so offsets match UI
-    document_text = req.document_text
+    document_text, doc_key = await _resolve_document(req)
     retrieve_min = 0.62
     top_k = 5
 
-    attack_terms = ["system prompt", "ignore", "developer message"]
-    if q_san.changed and any(t in req.question.lower() for t in attack_terms):
-        t1 = time.perf_counter()
-        return AskResponse(
-            answer=[],
-            abstained=True,
-            trace=Trace(
-                retrieved=[],
-                chunks_preview=[],
-                thresholds={"retrieve_min": retrieve_min},
-                timings_ms={"total": int((t1 - t0) * 1000)},
-                fallback_used=False,
-                dropped_sentences=0,
-                verification_scores=[],
-                sanitized={"question": True, "document": False},
-            ),
-        )
+    if _is_refused(req.question, q_san):
+        resp = _refused_response(t0, retrieve_min)
+        _finish_spans(rec, resp.abstained, resp.trace, req.debug)
+        return _recorded("ask", resp)
 
     # ---- Retrieval ----
-    t_retrieve0 = time.perf_counter()
-    retrieved = retrieve_top_k(
-        question=question,
-        document_text=document_text,
-        embedder=EMBEDDER,
-        cache=CACHE,
-        k=top_k,
+    async with EMBED_STAGE.slot() as admitted:
+        t_retrieve0 = time.perf_counter()
+        q_vec = None
+        if ANSWER_CACHE is not None:
+            # hash once: the same key serves the index cache and the answer cache scope
+            doc_key = doc_key or document_handle(document_text)
+            with stage("embed_query"):
+                q_vec = await run_cpu(EMBEDDER.embed_query, question)
+        retrieved = await run_cpu(
+            retrieve_top_k,
+            question=question,
+            document_text=document_text,
+            embedder=EMBEDDER,
+            cache=CACHE,
+            k=top_k,
+            fusion=FUSION,
+            doc_key=doc_key,
+            query_vec=q_vec,
+        )
+        t_retrieve1 = time.perf_counter()
+
+    resp = await _answer_from_retrieved(
+        q_san,
+        retrieved,
+        t0=t0,
+        timings_ms={"retrieve": int((t_retrieve1 - t_retrieve0) * 1000)},
+        retrieve_min=retrieve_min,
+        answer_scope=doc_key,
+        query_vec=q_vec,
+        queue={"embed": admitted.as_trace()},
     )
-    t_retrieve1 = time.perf_counter()
+    _finish_spans(rec, resp.abstained, resp.trace, req.debug)
+    return _recorded("ask", resp)
 
-    trace_retrieved = [RetrievedChunk(chunk_id=r.chunk.chunk_id, score=r.score) for r in retrieved]
-    trace_preview = [
-        ChunkPreview(
-            chunk_id=r.chunk.chunk_id,
-            score=r.score,
-            start=r.chunk.start,
-            end=r.chunk.end,
-            text=r.chunk.text[:600],
+
+@app.post("/ask/batch", response_model=AskBatchResponse)
+async def ask_batch(req: AskBatchRequest):
+    """
+    Many questions against one document. Retrieval is done once for all of
+    them (one cache lookup, one embedding forward pass, one score matrix);
+    generation runs concurrently, at most BATCH_CONCURRENCY at a time.
+    A question shed by the generate stage comes back abstained with
+    trace.shed set; only when every question is shed does the whole batch
+    get the 429 / 503.
+    """
+    t0 = time.perf_counter()
+    document_text, doc_key = await _resolve_document(req)
+    retrieve_min = 0.62
+    top_k = 5
+
+    q_sans = [sanitize_question(q) for q in req.questions]
+    todo = [i for i, (raw, q_san) in enumerate(zip(req.questions, q_sans)) if not _is_refused(raw, q_san)]
+
+    retrieved_by_q: Dict[int, List[Retrieved]] = {}
+    retrieve_ms = 0
+    admitted: Optional[Admission] = None
+    if todo:  # every question refused: the document is never chunked or embedded
+        async with EMBED_STAGE.slot() as admitted:
+            t_retrieve0 = time.perf_counter()
+            retrieved_lists = await run_cpu(
+                retrieve_top_k_batch,
+                questions=[q_sans[i].text for i in todo],
+                document_text=document_text,
+                embedder=EMBEDDER,
+                cache=CACHE,
+                k=top_k,
+                fusion=FUSION,
+                doc_key=doc_key,
+            )
+            t_retrieve1 = time.perf_counter()
+        retrieve_ms = int((t_retrieve1 - t_retrieve0) * 1000)
+        retrieved_by_q = dict(zip(todo, retrieved_lists))
+
+    sem = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def one(i: int) -> AskResponse:
+        if i not in retrieved_by_q:
+            return _recorded("ask_batch", _refused_response(t0, retrieve_min))
+        try:
+            async with sem:
+                # each question's SLO clock starts when it gets a batch slot, and an
+                # overrun is cancelled, not detached: that would escape the semaphore
+                resp = await _answer_from_retrieved(
+                    q_sans[i],
+                    retrieved_by_q[i],
+                    t0=t0,
+                    timings_ms={"retrieve": retrieve_ms},
+                    retrieve_min=retrieve_min,
+                    queue={"embed": admitted.as_trace()},
+                    deadline_t0=time.perf_counter(),
+                    detach=False,
+                )
+        except Overloaded as e:
+            shed[i] = e
+            resp = _shed_response(e, retrieved_by_q[i], t0, retrieve_ms, retrieve_min)
+        return _recorded("ask_batch", resp)
+
+    shed: Dict[int, Overloaded] = {}
+    results = await asyncio.gather(*(one(i) for i in range(len(req.questions))))
+    if todo and len(shed) == len(todo):
+        raise shed[todo[0]]  # nothing was admitted: the batch as a whole is overloaded
+    return AskBatchResponse(
+        results=list(results),
+        timings_ms={"retrieve": retrieve_ms, "total": int((time.perf_counter() - t0) * 1000)},
+    )
+
+
+def _shed_response(exc: Overloaded, retrieved: List[Retrieved], t0: float, retrieve_ms: int, retrieve_min: float) -> AskResponse:
+    trace_retrieved, trace_preview = _trace_chunks(retrieved)
+    return AskResponse(
+        answer=[],
+        abstained=True,
+        trace=Trace(
+            retrieved=trace_retrieved,
+            chunks_preview=trace_preview,
+            thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
+            timings_ms={"retrieve": retrieve_ms, "total": int((time.perf_counter() - t0) * 1000)},
+            shed={"stage": exc.stage, "status": exc.status, "retry_after_s": exc.retry_after_s},
+        ),
+    )
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _detach_cap() -> int:
+    # a detached generation still holds its GENERATE_STAGE slot and backend slot
+    if GENERATE_STAGE.limit > 0:
+        return min(SLO_MAX_DETACHED, GENERATE_STAGE.limit // 2)
+    return SLO_MAX_DETACHED
+
+
+async def _within_slo(coro: Awaitable[AnswerOut], t0: float, *, detach: bool = True) -> AnswerOut:
+    """
+    Await the generation, but give up once SLO_MS since t0 has passed
+    (raises DeadlineExceeded). The generation task is shielded from the
+    timeout; on overrun it is left running in the background (bounded by
+    _detach_cap()) so its response still lands in GEN_CACHE, or cancelled
+    (always, with detach=False). A deadline already gone on entry raises
+    without starting the generation.
+    """
+    if SLO_MS <= 0:
+        return await coro
+    remaining = SLO_MS / 1000.0 - (time.perf_counter() - t0)
+    if remaining <= 0:
+        if asyncio.iscoroutine(coro):
+            coro.close()  # never started; nothing to detach
+        raise DeadlineExceeded()
+    task = asyncio.ensure_future(coro)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=remaining)
+    except asyncio.TimeoutError:
+        if detach and SLO_DETACH and len(_DETACHED) < _detach_cap():
+            _DETACHED.add(task)
+            task.add_done_callback(_reap_detached)
+        else:
+            task.cancel()
+        raise DeadlineExceeded()
+    except asyncio.CancelledError:
+        task.cancel()  # client went away
+        raise
+
+
+async def _generate_admitted(question: str, retrieved: List[Retrieved], queue: Dict[str, Dict[str, float]]) -> AnswerOut:
+    async with GENERATE_STAGE.slot() as admitted:
+        queue["generate"] = admitted.as_trace()
+        return await generate_verified_answer_async(
+            question,
+            retrieved,
+            client=OLLAMA,
+            verify_min_score=0.40,
+            cache=GEN_CACHE,
+            budget_tokens=PROMPT_BUDGET,
         )
-        for r in retrieved
-    ]
+
+
+def _reap_detached(task: "asyncio.Task[AnswerOut]") -> None:
+    _DETACHED.discard(task)
+    if not task.cancelled():
+        task.exception()  # mark retrieved; a failed background generation is not an error
+
+
+async def _answer_from_retrieved(
+    q_san: Sanitized,
+    retrieved: List[Retrieved],
+    *,
+    t0: float,
+    timings_ms: Dict[str, int],
+    retrieve_min: float,
+    answer_scope: Optional[str] = None,
+    query_vec: Optional[np.ndarray] = None,
+    evidence_ids: Optional[List[str]] = None,
+    queue: Optional[Dict[str, Dict[str, float]]] = None,
+    deadline_t0: Optional[float] = None,
+    detach: bool = True,
+) -> AskResponse:
+    """
+    Shared tail of /ask and /corpus/ask: abstain on weak evidence, otherwise
+    generate + verify, falling back to an evidence-only answer on failure.
+    The SLO deadline runs from deadline_t0 (default: t0); detach=False
+    cancels an overrunning generation instead of detaching it.
+
+    With answer_scope + query_vec, a verified answer to a near-duplicate
+    question over the same evidence (evidence_ids, default: the retrieved
+    chunk ids) is served from ANSWER_CACHE without generating.
+    queue: admission info of earlier stages, extended with "generate".
+    Raises Overloaded when the generation stage sheds the request.
+    """
+    question = q_san.text
+    queue = dict(queue or {})
+    trace_retrieved, trace_preview = _trace_chunks(retrieved)
+    use_answer_cache = ANSWER_CACHE is not None and answer_scope is not None and query_vec is not None
+    if evidence_ids is None:
+        evidence_ids = [r.chunk.chunk_id for r in retrieved]
 
     # Abstain if no evidence or low similarity
-    if not retrieved or retrieved[0].score < retrieve_min:
+    if _weak_evidence(retrieved, retrieve_min):
         t1 = time.perf_counter()
         return AskResponse(
             answer=[],
@@ -147,26 +670,52 @@ def ask(req: AskRequest):
             trace=Trace(
                 retrieved=trace_retrieved,
                 chunks_preview=trace_preview,
-                thresholds={"retrieve_min": retrieve_min},
-                timings_ms={
-                    "retrieve": int((t_retrieve1 - t_retrieve0) * 1000),
-                    "total": int((t1 - t0) * 1000),
-                },
+                thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
+                timings_ms={**timings_ms, "total": int((t1 - t0) * 1000)},
                 fallback_used=False,
                 dropped_sentences=0,
                 verification_scores=[],
                 sanitized={"question": q_san.changed, "document": False},
+                queue=queue,
             ),
         )
 
+    if use_answer_cache:
+        hit = ANSWER_CACHE.get(answer_scope, query_vec, evidence_ids)
+        if hit is not None:
+            answer_sentences, verification_scores, dropped, sanitized = hit
+            t1 = time.perf_counter()
+            return AskResponse(
+                answer=[a.model_copy(deep=True) for a in answer_sentences],
+                abstained=False,
+                trace=Trace(
+                    retrieved=trace_retrieved,
+                    chunks_preview=trace_preview,
+                    thresholds={
+                        "retrieve_min": retrieve_min,
+                        "lexical_min": LEXICAL_MIN,
+                        "verify_min": 0.40,
+                        "answer_cache_min": ANSWER_CACHE.threshold,
+                    },
+                    timings_ms={**timings_ms, "total": int((t1 - t0) * 1000)},
+                    fallback_used=False,
+                    dropped_sentences=dropped,
+                    verification_scores=list(verification_scores),
+                    sanitized=dict(sanitized),
+                    cache_hits={"answer": True},
+                    queue=queue,
+                ),
+            )
+
     # ---- Generation + verification ----
     t_gen0 = time.perf_counter()
     try:
-        out = generate_verified_answer(
-            question,
-            retrieved,
-            verify_min_score=0.40,
-        )
+        with span("generate"):
+            out = await _within_slo(
+                _generate_admitted(question, retrieved, queue),
+                t0 if deadline_t0 is None else deadline_t0,
+                detach=detach,
+            )
         t_gen1 = time.perf_counter()
 
         # Day 6: robust NO_EVIDENCE detection (models may add whitespace / extra tokens)
@@ -178,9 +727,9 @@ def ask(req: AskRequest):
                 trace=Trace(
                     retrieved=trace_retrieved,
                     chunks_preview=trace_preview,
-                    thresholds={"retrieve_min": retrieve_min},
+                    thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
                     timings_ms={
-                        "retrieve": int((t_retrieve1 - t_retrieve0) * 1000),
+                        **timings_ms,
                         "generate": int((t_gen1 - t_gen0) * 1000),
                         "total": int((t1 - t0) * 1000),
                     },
@@ -188,6 +737,8 @@ def ask(req: AskRequest):
                     dropped_sentences=out.dropped_sentences,
                     verification_scores=[],
                     sanitized={"question": out.sanitized_question, "document": out.sanitized_document},
+                    cache_hits={"generation": out.generation_cached},
+                    queue=queue,
                 ),
             )
 
@@ -206,6 +757,17 @@ def ask(req: AskRequest):
                 )
             )
 
+        sanitized = {"question": out.sanitized_question, "document": out.sanitized_document}
+        cache_hits = {"generation": out.generation_cached}
+        if use_answer_cache:
+            ANSWER_CACHE.put(
+                answer_scope,
+                query_vec,
+                evidence_ids,
+                ([a.model_copy(deep=True) for a in answer_sentences], verification_scores, out.dropped_sentences, sanitized),
+            )
+            cache_hits["answer"] = False
+
         t1 = time.perf_counter()
         return AskResponse(
             answer=answer_sentences,
@@ -213,20 +775,24 @@ def ask(req: AskRequest):
             trace=Trace(
                 retrieved=trace_retrieved,
                 chunks_preview=trace_preview,
-                thresholds={"retrieve_min": retrieve_min, "verify_min": 0.40},
+                thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN, "verify_min": 0.40},
                 timings_ms={
-                    "retrieve": int((t_retrieve1 - t_retrieve0) * 1000),
+                    **timings_ms,
                     "generate": int((t_gen1 - t_gen0) * 1000),
                     "total": int((t1 - t0) * 1000),
                 },
                 fallback_used=False,
                 dropped_sentences=out.dropped_sentences,
                 verification_scores=verification_scores,
-                sanitized={"question": out.sanitized_question, "document": out.sanitized_document},
+                sanitized=sanitized,
+                cache_hits=cache_hits,
+                queue=queue,
             ),
         )
 
-    except Exception:
+    except Overloaded:
+        raise  # shed load: answered with 429 / 503, not with a fallback
+    except Exception as e:
         # Fallback: evidence-only (never break demo)
         top = retrieved[0]
         excerpt, cite_start, cite_end = evidence_only_answer(top)
@@ -248,9 +814,9 @@ def ask(req: AskRequest):
             trace=Trace(
                 retrieved=trace_retrieved,
                 chunks_preview=trace_preview,
-                thresholds={"retrieve_min": retrieve_min, "verify_min": 0.40},
+                thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN, "verify_min": 0.40},
                 timings_ms={
-                    "retrieve": int((t_retrieve1 - t_retrieve0) * 1000),
+                    **timings_ms,
                     "generate": int((t_gen1 - t_gen0) * 1000),
                     "total": int((t1 - t0) * 1000),
                 },
@@ -258,5 +824,228 @@ def ask(req: AskRequest):
                 dropped_sentences=0,
                 verification_scores=[],
                 sanitized={"question": q_san.changed, "document": d_chunk_san.changed},
+                deadline_hit=isinstance(e, DeadlineExceeded),
+                queue=queue,
             ),
-        )
\ No newline at end of file
+        )
+
+
+# ---- Corpus mode (many documents, ANN retrieval) ----
+@app.post("/corpus/documents", response_model=CorpusIngestResponse)
+async def corpus_ingest(req: CorpusIngestRequest):
+    try:
+        async with EMBED_STAGE.slot():
+            doc_id, n_chunks = await run_cpu(CORPUS.ingest, req.document_text, EMBEDDER, doc_id=req.doc_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return CorpusIngestResponse(doc_id=doc_id, chunks=n_chunks)
+
+
+@app.post("/corpus/ask", response_model=AskResponse)
+async def corpus_ask(req: CorpusAskRequest):
+    t0 = time.perf_counter()
+    rec = _start_spans("corpus_ask", req.debug)
+    q_san = sanitize_question(req.question)
+    retrieve_min = 0.62
+
+    if _is_refused(req.question, q_san):
+        resp = _refused_response(t0, retrieve_min)
+        _finish_spans(rec, resp.abstained, resp.trace, req.debug)
+        return _recorded("corpus_ask", resp)
+
+    async with EMBED_STAGE.slot() as admitted:
+        t_retrieve0 = time.perf_counter()
+        with stage("embed_query"):
+            q = await run_cpu(EMBEDDER.embed_query, q_san.text)
+        with stage("score"):
+            hits = await run_cpu(CORPUS.search, q, req.top_k)
+        t_retrieve1 = time.perf_counter()
+
+    # Chunk ids repeat across documents (every doc has c0000...), so the prompt
+    # gets unique local ids; they are mapped back to (doc_id, chunk_id) below.
+    # Labels follow (doc_id, chunk_id) order, so the same set of hits always gets
+    # the same labels (cached answers cite local ids); the dict keeps score order.
+    ordered = sorted(range(len(hits)), key=lambda i: (hits[i].doc_id, hits[i].chunk.chunk_id))
+    label = {i: f"c{n:04d}" for n, i in enumerate(ordered)}
+    local_ids = {label[i]: h for i, h in enumerate(hits)}
+    retrieved = [Retrieved(chunk=replace(h.chunk, chunk_id=cid), score=h.score) for cid, h in local_ids.items()]
+
+    resp = await _answer_from_retrieved(
+        q_san,
+        retrieved,
+        t0=t0,
+        timings_ms={"retrieve": int((t_retrieve1 - t_retrieve0) * 1000)},
+        retrieve_min=retrieve_min,
+        answer_scope="corpus",
+        query_vec=q,
+        evidence_ids=[f"{h.doc_id}/{h.chunk.chunk_id}" for h in hits],
+        queue={"embed": admitted.as_trace()},
+    )
+
+    for item in (
+        [c for sent in resp.answer for c in sent.citations] + resp.trace.retrieved + resp.trace.chunks_preview
+    ):
+        hit = local_ids.get(item.chunk_id)
+        if hit is not None:
+            item.doc_id = hit.doc_id
+            item.chunk_id = hit.chunk.chunk_id
+    _finish_spans(rec, resp.abstained, resp.trace, req.debug)
+    return _recorded("corpus_ask", resp)
+
+
+# ---- Streaming (NDJSON) ----
+def _ndjson(event: Dict) -> bytes:
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+
+def _sentence_event(vs: VerifiedSentence) -> bytes:
+    sent = AnswerSentence(
+        sentence=vs.sentence,
+        citations=[Citation(chunk_id=c.chunk_id, start=c.start, end=c.end) for c in vs.citations],
+    )
+    return _ndjson({"type": "sentence", **sent.model_dump(exclude_none=True), "score": vs.best_score})
+
+
+def _done_event(abstained: bool, trace: Trace, rec: Optional[SpanRecorder] = None, debug: bool = False) -> bytes:
+    _finish_spans(rec, abstained, trace, debug)
+    _record("ask_stream", abstained, trace)
+    return _ndjson({"type": "done", "abstained": abstained, "trace": trace.model_dump()})
+
+
+def _overloaded_event(exc: Overloaded) -> bytes:
+    return _ndjson({"type": "error", "status": exc.status, "detail": str(exc), "retry_after": exc.retry_after_s})
+
+
+async def _ask_stream_events(req: AskRequest, document_text: str, doc_key: Optional[str]) -> AsyncIterator[bytes]:
+    t0 = time.perf_counter()
+    rec = _start_spans("ask_stream", req.debug)
+
+    q_san = sanitize_question(req.question)
+    question = q_san.text
+    retrieve_min = 0.62
+    top_k = 5
+
+    if _is_refused(req.question, q_san):
+        yield _done_event(True, _refused_response(t0, retrieve_min).trace, rec, req.debug)
+        return
+
+    try:
+        async with EMBED_STAGE.slot() as admitted:
+            t_retrieve0 = time.perf_counter()
+            retrieved = await run_cpu(
+                retrieve_top_k,
+                question=question,
+                document_text=document_text,
+                embedder=EMBEDDER,
+                cache=CACHE,
+                k=top_k,
+                fusion=FUSION,
+                doc_key=doc_key,
+            )
+            t_retrieve1 = time.perf_counter()
+    except Overloaded as e:
+        yield _overloaded_event(e)
+        return
+    queue = {"embed": admitted.as_trace()}
+    trace_retrieved, trace_preview = _trace_chunks(retrieved)
+    timings = {"retrieve": int((t_retrieve1 - t_retrieve0) * 1000)}
+
+    if _weak_evidence(retrieved, retrieve_min):
+        timings["total"] = int((time.perf_counter() - t0) * 1000)
+        yield _done_event(True, Trace(
+            retrieved=trace_retrieved,
+            chunks_preview=trace_preview,
+            thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
+            timings_ms=timings,
+            sanitized={"question": q_san.changed, "document": False},
+            queue=queue,
+        ), rec, req.debug)
+        return
+
+    # ---- Generation: verify + emit each sentence as soon as it completes ----
+    t_gen0 = time.perf_counter()
+    stream = VerifiedAnswerStream(
+        question,
+        retrieved,
+        client=OLLAMA,
+        verify_min_score=0.40,
+        cache=GEN_CACHE,
+        budget_tokens=PROMPT_BUDGET,
+    )
+    try:
+        async with GENERATE_STAGE.slot() as admitted:
+            queue["generate"] = admitted.as_trace()
+            try:
+                async for vs in stream.sentences():
+                    if "first_sentence" not in timings:
+                        timings["first_sentence"] = int((time.perf_counter() - t_gen0) * 1000)
+                    yield _sentence_event(vs)
+            except Exception as e:
+                # whatever was verified before the failure stands; fallback below if nothing did
+                yield _ndjson({"type": "error", "stage": "generate", "detail": f"{type(e).__name__}: {e}"})
+    except Overloaded as e:
+        yield _overloaded_event(e)
+        return
+    out = stream.result()
+    timings["generate"] = int((time.perf_counter() - t_gen0) * 1000)
+
+    thresholds = {"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN, "verify_min": 0.40}
+    sanitized = {"question": out.sanitized_question, "document": out.sanitized_document}
+
+    if not out.verified and "I don't know. [NO_EVIDENCE]" in out.raw_model_text:
+        timings["total"] = int((time.perf_counter() - t0) * 1000)
+        yield _done_event(True, Trace(
+            retrieved=trace_retrieved,
+            chunks_preview=trace_preview,
+            thresholds={"retrieve_min": retrieve_min, "lexical_min": LEXICAL_MIN},
+            timings_ms=timings,
+            dropped_sentences=out.dropped_sentences,
+            sanitized=sanitized,
+            cache_hits={"generation": out.generation_cached},
+            queue=queue,
+        ), rec, req.debug)
+        return
+
+    fallback_used = not out.verified
+    if fallback_used:
+        # Same evidence-only fallback as /ask (never break demo)
+        top = retrieved[0]
+        excerpt, cite_start, cite_end = evidence_only_answer(top)
+        sanitized = {"question": q_san.changed, "document": sanitize_document(top.chunk.text).changed}
+        yield _ndjson({
+            "type": "sentence",
+            "sentence": excerpt,
+            "citations": [{"chunk_id": top.chunk.chunk_id, "start": cite_start, "end": cite_end}],
+            "score": None,
+        })
+
+    timings["total"] = int((time.perf_counter() - t0) * 1000)
+    yield _done_event(False, Trace(
+        retrieved=trace_retrieved,
+        chunks_preview=trace_preview,
+        thresholds=thresholds,
+        timings_ms=timings,
+        fallback_used=fallback_used,
+        dropped_sentences=0 if fallback_used else out.dropped_sentences,
+        verification_scores=[vs.best_score for vs in out.verified],
+        sanitized=sanitized,
+        cache_hits={"generation": out.generation_cached},
+        queue=queue,
+    ), rec, req.debug)
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    """
+    Streaming /ask. Response is NDJSON (application/x-ndjson):
+      {"type": "sentence", "sentence": ..., "citations": [...], "score": ...}  per verified sentence
+      {"type": "done", "abstained": ..., "trace": {...}}                      exactly once, last
+    If generation fails midway, {"type": "error", "stage": "generate", "detail": ...}
+    precedes the (possibly evidence-only) rest of the answer and "done".
+    A request shed while queued (after the 200 went out) ends with
+      {"type": "error", "status": 503, "detail": ..., "retry_after": ...}   instead of "done".
+    """
+    document_text, doc_key = await _resolve_document(req)  # 404 before the stream starts
+    EMBED_STAGE.check()  # full queues: plain 429 before the stream starts
+    GENERATE_STAGE.check()
+    return StreamingResponse(_ask_stream_events(req, document_text, doc_key), media_type="application/x-ndjson")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from .metrics import METRICS
+from .tracing import span
+
+
+class Overloaded(Exception):
+    """
+    A request shed by a StageLimiter: status 429 when the wait queue is
+    full (rejected on arrival), 503 when it waited max_wait_s without a slot.
+    """
+    def __init__(self, stage: str, status: int, retry_after_s: int, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.status = status
+        self.retry_after_s = retry_after_s
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class Admission:
+    wait_ms: float
+    depth: int  # requests already queued when this one arrived
+
+    def as_trace(self) -> Dict[str, float]:
+        return {"wait_ms": round(self.wait_ms, 2), "depth": self.depth}
+
+
+class StageLimiter:
+    """
+    Concurrency limit for one pipeline stage with a bounded FIFO wait queue.
+
+      limit       requests inside the stage at once (0 = unlimited)
+      max_queue   requests allowed to wait; one more is rejected at once (429)
+      max_wait_s  a waiter that gets no slot in time is rejected (503)
+
+    Rejections carry a Retry-After estimate: the recent time a request holds
+    a slot, times the number of "rounds" the queue needs to drain.
+    Async-only; state is touched from the event loop alone.
+    """
+    def __init__(self, name: str, limit: int, *, max_queue: int = 64, max_wait_s: float = 5.0, ewma_alpha: float = 0.2):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.ewma_alpha = ewma_alpha
+        self.active = 0
+        self.queued = 0
+        self._hold_s: Optional[float] = None  # EWMA of time spent inside the stage
+        self._wait_s = 0.0  # EWMA of queue wait of admitted requests
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+        return self._cond
+
+    def _has_slot(self) -> bool:
+        return self.limit <= 0 or self.active < self.limit
+
+    def retry_after_s(self) -> int:
+        rounds = (self.queued + 1) / max(1, self.limit)
+        return max(1, math.ceil(rounds * (self._hold_s or 1.0)))
+
+    def check(self) -> None:
+        """Fast 429 without taking a slot (for callers that admit later, e.g. inside a stream)."""
+        if not self._has_slot() and self.queued >= self.max_queue:
+            self._rejected_full += 1
+            METRICS.inc("trustcite_rejected_total", stage=self.name, status=429)
+            raise Overloaded(self.name, 429, self.retry_after_s(), "queue full")
+
+    async def acquire(self) -> Admission:
+        depth = self.queued
+        if self._has_slot() and not self.queued:
+            self.active += 1
+            self._admitted_after(0.0)
+            return Admission(wait_ms=0.0, depth=0)
+        self.check()
+
+        cond = self._condition()
+        t0 = time.perf_counter()
+        self.queued += 1
+        try:
+            with span(f"queue.{self.name}", depth=depth):
+                async with cond:
+                    await asyncio.wait_for(cond.wait_for(self._has_slot), timeout=self.max_wait_s)
+                    self.active += 1
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            METRICS.inc("trustcite_rejected_total", stage=self.name, status=503)
+            raise Overloaded(self.name, 503, self.retry_after_s(), f"no slot within {self.max_wait_s:g}s") from None
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - t0
+        self._admitted_after(waited)
+        return Admission(wait_ms=waited * 1000, depth=depth)
+
+    def _admitted_after(self, waited_s: float) -> None:
+        self._admitted += 1
+        METRICS.observe("trustcite_queue_wait_seconds", waited_s, stage=self.name)
+        self._wait_s = (1 - self.ewma_alpha) * self._wait_s + self.ewma_alpha * waited_s
+
+    async def release(self, held_s: float) -> None:
+        self.active -= 1
+        self._hold_s = held_s if self._hold_s is None else (1 - self.ewma_alpha) * self._hold_s + self.ewma_alpha * held_s
+        if self.queued:
+            cond = self._condition()
+            async with cond:
+                cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Admission]:
+        admission = await self.acquire()
+        t0 = time.perf_counter()
+        try:
+            yield admission
+        finally:
+            await asyncio.shield(self.release(time.perf_counter() - t0))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self._admitted,
+            "rejected_full": self._rejected_full,
+            "rejected_timeout": self._rejected_timeout,
+            "wait_ms_avg": round(self._wait_s * 1000, 2),
+            "hold_ms_avg": round((self._hold_s or 0.0) * 1000, 2),
+        }
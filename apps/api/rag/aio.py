@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_CPU_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def cpu_executor() -> ThreadPoolExecutor:
+    """
+    Dedicated pool for CPU-bound stages (embedding, scoring, verification),
+    sized by TRUSTCITE_CPU_WORKERS. Kept apart from the event loop so async
+    handlers never block on numpy / torch work.
+    """
+    global _CPU_POOL
+    if _CPU_POOL is None:
+        workers = int(os.getenv("TRUSTCITE_CPU_WORKERS", "0")) or min(8, (os.cpu_count() or 1) + 2)
+        _CPU_POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trustcite-cpu")
+    return _CPU_POOL
+
+
+async def run_cpu(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """
+    Await fn(*args, **kwargs) on the CPU pool, carrying contextvars along
+    (run_in_executor does not copy the caller's context by itself).
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(cpu_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def shutdown_cpu_executor() -> None:
+    global _CPU_POOL
+    if _CPU_POOL is not None:
+        _CPU_POOL.shutdown(wait=False, cancel_futures=True)
+        _CPU_POOL = None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _kmeans(x: np.ndarray, k: int, *, iters: int = 12, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (cosine) on L2-normalized rows. Returns (k, d) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():  # re-seed empty clusters from random points
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1.0)
+    return centroids.astype(np.float32)
+
+
+def _grown(buf: np.ndarray, live: int, need: int) -> np.ndarray:
+    """buf with room for `need` rows (capacity doubles); the first `live` rows are kept."""
+    if need <= len(buf):
+        return buf
+    out = np.zeros((max(need, 2 * len(buf), 16),) + buf.shape[1:], dtype=buf.dtype)
+    out[:live] = buf[:live]
+    return out
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index for cosine similarity, pure numpy.
+
+    Vectors are partitioned by spherical k-means into n_lists clusters.
+    A query scores the centroids, then only the rows of the n_probe closest
+    lists (one gather + one matmul). Rows appended after training go to
+    their nearest existing list (appended in place, amortized O(batch));
+    the index re-trains itself once it has grown 4x since the last training.
+    Below min_train_size the index is just brute force.
+    """
+    def __init__(self, dim: int, *, n_probe: int = 16, min_train_size: int = 4096):
+        self.dim = dim
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self._buf = np.zeros((0, dim), dtype=np.float32)  # grows by doubling; rows [0, _n) are live
+        self._n = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros((0,), dtype=np.int32)  # list id per row, same growth as _buf
+        self._lists: List[np.ndarray] = []  # row ids per list, each grows by doubling
+        self._list_len = np.zeros((0,), dtype=np.int64)  # live prefix of each _lists buffer
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._buf[: self._n]
+
+    @property
+    def assign(self) -> np.ndarray:
+        return self._assign[: self._n]
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def add(self, vecs: np.ndarray) -> None:
+        vecs = np.asarray(vecs, dtype=np.float32).reshape(-1, self.dim)
+        start, need = self._n, self._n + len(vecs)
+        if need > len(self._buf):
+            cap = max(need, 2 * len(self._buf), 1024)
+            grown = np.zeros((cap, self.dim), dtype=np.float32)
+            grown[: self._n] = self.vectors
+            self._buf = grown
+            self._assign = _grown(self._assign, self._n, cap)
+        self._buf[start:need] = vecs
+        self._n = need
+        if self.centroids is None:
+            if len(self) >= self.min_train_size:
+                self.train()
+            return
+        if len(self) >= 4 * self._trained_size:  # drifted far from the trained distribution
+            self.train()
+            return
+        new_assign = np.argmax(vecs @ self.centroids.T, axis=1).astype(np.int32)
+        self._assign[start:need] = new_assign
+        self._append_to_lists(np.arange(start, need), new_assign)
+
+    def train(self, n_lists: Optional[int] = None) -> None:
+        n = len(self)
+        if n == 0:
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        # k-means on a sample keeps training cost bounded on big corpora
+        rng = np.random.default_rng(0)
+        sample = self.vectors if n <= 64 * n_lists else self.vectors[rng.choice(n, 64 * n_lists, replace=False)]
+        self.centroids = _kmeans(sample, n_lists)
+        self._assign[:n] = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self._trained_size = n
+        self._lists = [np.zeros((0,), dtype=np.int64) for _ in range(n_lists)]
+        self._list_len = np.zeros((n_lists,), dtype=np.int64)
+        self._append_to_lists(np.arange(n), self.assign)
+
+    def _append_to_lists(self, rows: np.ndarray, assign: np.ndarray) -> None:
+        """Append rows (ascending ids) to their lists; only the touched lists are written."""
+        order = np.argsort(assign, kind="stable")
+        lists, bounds = np.unique(assign[order], return_index=True)
+        bounds = np.append(bounds, len(order))
+        for lid, lo, hi in zip(lists.tolist(), bounds[:-1].tolist(), bounds[1:].tolist()):
+            size = int(self._list_len[lid])
+            self._lists[lid] = _grown(self._lists[lid], size, size + hi - lo)
+            self._lists[lid][size:size + hi - lo] = rows[order[lo:hi]]
+            self._list_len[lid] = size + hi - lo
+
+    def _list(self, lid: int) -> np.ndarray:
+        return self._lists[lid][: self._list_len[lid]]
+
+    def search(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (row ids, scores), best first."""
+        q = np.asarray(q, dtype=np.float32)
+        if len(self) == 0 or k <= 0:
+            return np.zeros((0,), dtype=np.int64), np.zeros((0,), dtype=np.float32)
+
+        if self.centroids is None:
+            cand = np.arange(len(self))
+        else:
+            probe = min(self.n_probe, len(self.centroids))
+            near = np.argpartition(-(self.centroids @ q), probe - 1)[:probe]
+            cand = np.concatenate([self._list(int(i)) for i in near])
+            if len(cand) < k:  # tiny probe set: fall back to exhaustive
+                cand = np.arange(len(self))
+
+        scores = self.vectors[cand] @ q
+        k = min(k, len(cand))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return cand[top], scores[top]
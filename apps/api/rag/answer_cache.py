@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class _DocAnswers:
+    vecs: np.ndarray  # (capacity, d) question vectors, rows [0, n) live
+    evidence: List[Tuple[str, ...]] = field(default_factory=list)  # sorted retrieved chunk ids per row
+    answers: List[Any] = field(default_factory=list)
+    n: int = 0
+    next_row: int = 0  # ring buffer: oldest row is overwritten when full
+
+
+class SemanticAnswerCache:
+    """
+    Per-document cache of verified answers, looked up by question meaning.
+
+    A new question reuses a stored answer when (1) its query vector (the one
+    retrieval already computed) has cosine >= threshold with a previously
+    answered question on the same document, and (2) retrieval returned the
+    same chunk ids, so the cited evidence is identical. Lookup is one
+    (n, d) @ (d,) product over that document's questions.
+
+    Bounded to max_docs documents (LRU) x max_per_doc questions (ring buffer).
+    """
+    def __init__(self, *, threshold: float = 0.90, max_docs: int = 64, max_per_doc: int = 256):
+        self.threshold = threshold
+        self.max_docs = max_docs
+        self.max_per_doc = max_per_doc
+        self._docs: "OrderedDict[str, _DocAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, scope: str, q: np.ndarray, evidence_ids: Sequence[str]) -> Optional[Any]:
+        ev = tuple(sorted(evidence_ids))
+        with self._lock:
+            doc = self._docs.get(scope)
+            if doc is not None and doc.n:
+                self._docs.move_to_end(scope)
+                scores = doc.vecs[: doc.n] @ q
+                for row in np.argsort(-scores):
+                    if scores[row] < self.threshold:
+                        break
+                    if doc.evidence[row] == ev:
+                        self._hits += 1
+                        return doc.answers[row]
+            self._misses += 1
+            return None
+
+    def put(self, scope: str, q: np.ndarray, evidence_ids: Sequence[str], answer: Any) -> None:
+        q = np.asarray(q, dtype=np.float32)
+        ev = tuple(sorted(evidence_ids))
+        with self._lock:
+            doc = self._docs.get(scope)
+            if doc is None:
+                doc = self._docs[scope] = _DocAnswers(vecs=np.zeros((self.max_per_doc, q.shape[0]), dtype=np.float32))
+                while len(self._docs) > self.max_docs:
+                    self._docs.popitem(last=False)
+            self._docs.move_to_end(scope)
+
+            row = doc.next_row
+            doc.vecs[row] = q
+            if row < len(doc.answers):
+                doc.evidence[row] = ev
+                doc.answers[row] = answer
+            else:
+                doc.evidence.append(ev)
+                doc.answers.append(answer)
+            doc.n = max(doc.n, row + 1)
+            doc.next_row = (row + 1) % self.max_per_doc
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "documents": len(self._docs),
+                "answers": sum(d.n for d in self._docs.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            }
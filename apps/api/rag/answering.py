@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from .retrieval import Retrieved
 from .chunking import Chunk
-from .generation import ollama_generate
-from .citations import enforce_citations
+from .aio import run_cpu
+from .metrics import METRICS, stage
+from .tracing import span
+from .gen_cache import GenerationCache
+from .backends import GenerationClient
+from .generation import generation_cache_key
+from .citations import enforce_citations, split_complete_sentences, split_sentences
 from .guardrails import sanitize_question, sanitize_document
+from .prompt_budget import estimate_tokens, num_ctx_for, pack_evidence
+from .span_align import ChunkSpanIndex
 from .verify import verify_all, VerifiedSentence
 
 
@@ -18,6 +26,7 @@ class AnswerOut:
     sanitized_question: bool
     sanitized_document: bool
     dropped_sentences: int
+    generation_cached: bool = False  # raw_model_text came from the GenerationCache
 
 
 def evidence_only_answer(top: Retrieved, max_chars: int = 240) -> Tuple[str, int, int]:
@@ -40,7 +49,18 @@ def evidence_only_answer(top: Retrieved, max_chars: int = 240) -> Tuple[str, int
     return excerpt, cite_start, cite_end
 
 
-def build_cited_prompt(question: str, retrieved: List[Retrieved], *, max_chars_per_chunk: int = 900) -> str:
+def build_cited_prompt(
+    question: str,
+    retrieved: List[Retrieved],
+    *,
+    max_chars_per_chunk: int = 900,
+    budget_tokens: Optional[int] = None,
+) -> str:
+    """
+    budget_tokens (optional) caps the estimated size of the whole prompt:
+    evidence is packed greedily in retrieval order (see pack_evidence) and
+    low-ranked chunks are trimmed or dropped. None includes every chunk.
+    """
     header = (
         "You are TrustCite.\n"
         "You answer questions using ONLY the EVIDENCE.\n"
@@ -51,45 +71,233 @@ def build_cited_prompt(question: str, retrieved: List[Retrieved], *, max_chars_p
         "3) If the evidence does not contain the answer, output exactly: I don't know. [NO_EVIDENCE]\n"
         "4) Do not add facts. Prefer using wording directly from the evidence.\n\n"
     )
+    footer = f"QUESTION:\n{question}\n\nANSWER:\n"
+
+    if budget_tokens is None:
+        packed = []
+        for r in retrieved:
+            chunk_text = r.chunk.text.strip()
+            if len(chunk_text) > max_chars_per_chunk:
+                chunk_text = chunk_text[:max_chars_per_chunk].rsplit(" ", 1)[0] + "…"
+            packed.append((r, chunk_text))
+    else:
+        fixed = estimate_tokens(header) + estimate_tokens(footer) + 8  # + <EVIDENCE> tags
+        packed = pack_evidence(retrieved, budget_tokens=budget_tokens - fixed, max_chars_per_chunk=max_chars_per_chunk)
 
-    evidence_lines = []
-    for r in retrieved:
-        chunk_text = r.chunk.text.strip()
-        if len(chunk_text) > max_chars_per_chunk:
-            chunk_text = chunk_text[:max_chars_per_chunk].rsplit(" ", 1)[0] + "…"
-        evidence_lines.append(f"<chunk id='{r.chunk.chunk_id}'>\n{chunk_text}\n</chunk>\n")
+    evidence_lines = [f"<chunk id='{r.chunk.chunk_id}'>\n{chunk_text}\n</chunk>\n" for r, chunk_text in packed]
 
     return (
         header
         + "<EVIDENCE>\n"
         + "\n".join(evidence_lines)
         + "</EVIDENCE>\n\n"
-        + f"QUESTION:\n{question}\n\nANSWER:\n"
+        + footer
+    )
+
+
+def _span_indexes(retrieved: List[Retrieved]) -> Dict[str, ChunkSpanIndex]:
+    return {r.chunk.chunk_id: r.span_index for r in retrieved if r.span_index is not None}
+
+
+def _finish_answer(
+    raw: str,
+    retrieved: List[Retrieved],
+    *,
+    sanitized_question: bool,
+    sanitized_document: bool,
+    verify_min_score: float,
+    generation_cached: bool = False,
+) -> AnswerOut:
+    chunks_by_id: Dict[str, Chunk] = {r.chunk.chunk_id: r.chunk for r in retrieved}
+    with stage("enforce"):
+        enforced = enforce_citations(raw, chunks_by_id=chunks_by_id)
+    with stage("verify"):
+        verified, dropped = verify_all(
+            enforced,
+            chunks_by_id=chunks_by_id,
+            min_score=verify_min_score,
+            span_indexes=_span_indexes(retrieved),
+        )
+
+    return AnswerOut(
+        verified=verified,
+        raw_model_text=raw,
+        sanitized_question=sanitized_question,
+        sanitized_document=sanitized_document,
+        dropped_sentences=dropped,
+        generation_cached=generation_cached,
     )
 
 
-def generate_verified_answer(
+def _num_ctx(prompt: str, budget_tokens: Optional[int]) -> Optional[int]:
+    # budgeted prompts also get a context window sized to fit (None = model default)
+    return num_ctx_for(prompt, budget_tokens=budget_tokens) if budget_tokens is not None else None
+
+
+async def _generate_cached(
+    prompt: str,
+    client: GenerationClient,
+    cache: Optional[GenerationCache],
+    *,
+    num_ctx: Optional[int] = None,
+) -> Tuple[str, bool]:
+    """(raw text, cache hit). Cache I/O (possibly disk) runs on the CPU pool."""
+    if cache is None:
+        with stage("llm"):
+            return await client.generate(prompt, num_ctx=num_ctx), False
+    key = generation_cache_key(prompt, client.cfg, num_ctx=num_ctx)
+    with span("gen_cache.get"):
+        raw = await run_cpu(cache.get, key)
+    if raw is not None:
+        return raw, True
+    with stage("llm"):
+        raw = await client.generate(prompt, num_ctx=num_ctx)
+    if raw:
+        await run_cpu(cache.put, key, raw)
+    return raw, False
+
+
+async def generate_verified_answer_async(
     question: str,
     retrieved: List[Retrieved],
     *,
+    client: GenerationClient,
     verify_min_score: float = 0.40,
+    cache: Optional[GenerationCache] = None,
+    budget_tokens: Optional[int] = None,
 ) -> AnswerOut:
+    """
+    Prompt -> LLM -> citation enforcement -> span verification. The LLM call
+    is awaited on the pooled async client; enforcement + verification
+    (CPU-bound) run on the CPU executor. With a cache, a repeat of the exact
+    same prompt skips the LLM call.
+    """
     q_san = sanitize_question(question)
 
     evidence_text = "\n\n".join(r.chunk.text for r in retrieved)
     d_san = sanitize_document(evidence_text)
 
-    prompt = build_cited_prompt(q_san.text, retrieved)
-    raw = ollama_generate(prompt)
-
-    chunks_by_id: Dict[str, Chunk] = {r.chunk.chunk_id: r.chunk for r in retrieved}
-    enforced = enforce_citations(raw, chunks_by_id=chunks_by_id)
-    verified, dropped = verify_all(enforced, chunks_by_id=chunks_by_id, min_score=verify_min_score)
+    with stage("prompt_build"):
+        prompt = build_cited_prompt(q_san.text, retrieved, budget_tokens=budget_tokens)
+    raw, cached = await _generate_cached(prompt, client, cache, num_ctx=_num_ctx(prompt, budget_tokens))
 
-    return AnswerOut(
-        verified=verified,
-        raw_model_text=raw,
+    return await run_cpu(
+        _finish_answer,
+        raw,
+        retrieved,
         sanitized_question=q_san.changed,
         sanitized_document=d_san.changed,
-        dropped_sentences=dropped,
+        verify_min_score=verify_min_score,
+        generation_cached=cached,
     )
+
+
+async def _one(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _timed_stream(pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Pass pieces through; the time spent waiting on them is observed as the "llm" stage."""
+    waited = 0.0
+    it = pieces.__aiter__()
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                piece = await it.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                waited += time.perf_counter() - t0
+            yield piece
+    finally:
+        METRICS.observe("trustcite_stage_seconds", waited, stage="llm")
+        await it.aclose()  # release the backend connection if the consumer stopped early
+
+
+class VerifiedAnswerStream:
+    """
+    Streaming variant of generate_verified_answer_async().
+
+    Consumes the Ollama token stream, cuts it into sentences with the same
+    boundary rule as split_sentences(), and runs enforce_citations +
+    verify_sentence on each sentence as soon as it is complete. Iterate
+    sentences() for verified sentences; result() gives the AnswerOut once
+    the stream is exhausted.
+    """
+    def __init__(
+        self,
+        question: str,
+        retrieved: List[Retrieved],
+        *,
+        client: GenerationClient,
+        verify_min_score: float = 0.40,
+        cache: Optional[GenerationCache] = None,
+        budget_tokens: Optional[int] = None,
+    ):
+        self.retrieved = retrieved
+        self.client = client
+        self.verify_min_score = verify_min_score
+        self.cache = cache
+        self.budget_tokens = budget_tokens
+        self._cached = False
+
+        self._q_san = sanitize_question(question)
+        self._d_san = sanitize_document("\n\n".join(r.chunk.text for r in retrieved))
+        self._chunks_by_id: Dict[str, Chunk] = {r.chunk.chunk_id: r.chunk for r in retrieved}
+        self._span_indexes = _span_indexes(retrieved)
+        self._raw: List[str] = []
+        self._verified: List[VerifiedSentence] = []
+        self._dropped = 0
+
+    def _verify_one(self, sentence: str) -> List[VerifiedSentence]:
+        with stage("enforce"):
+            enforced = enforce_citations(sentence, chunks_by_id=self._chunks_by_id)
+        with stage("verify"):
+            verified, dropped = verify_all(
+                enforced,
+                chunks_by_id=self._chunks_by_id,
+                min_score=self.verify_min_score,
+                span_indexes=self._span_indexes,
+            )
+        self._dropped += dropped
+        return verified
+
+    async def sentences(self) -> AsyncIterator[VerifiedSentence]:
+        with stage("prompt_build"):
+            prompt = build_cited_prompt(self._q_san.text, self.retrieved, budget_tokens=self.budget_tokens)
+        num_ctx = _num_ctx(prompt, self.budget_tokens)
+        pending = ""
+
+        key = generation_cache_key(prompt, self.client.cfg, num_ctx=num_ctx) if self.cache is not None else None
+        hit = await run_cpu(self.cache.get, key) if self.cache is not None else None
+        self._cached = hit is not None
+        # a cache hit replays the stored text as one piece
+        pieces = _one(hit) if hit is not None else _timed_stream(self.client.stream(prompt, num_ctx=num_ctx))
+
+        async for piece in pieces:
+            self._raw.append(piece)
+            done, pending = split_complete_sentences(pending + piece)
+            for sent in done:
+                for vs in await run_cpu(self._verify_one, sent):
+                    self._verified.append(vs)
+                    yield vs
+
+        for sent in split_sentences(pending):
+            for vs in await run_cpu(self._verify_one, sent):
+                self._verified.append(vs)
+                yield vs
+
+        raw = "".join(self._raw).strip()
+        if self.cache is not None and not self._cached and raw:
+            await run_cpu(self.cache.put, key, raw)
+
+    def result(self) -> AnswerOut:
+        return AnswerOut(
+            verified=list(self._verified),
+            raw_model_text="".join(self._raw).strip(),
+            sanitized_question=self._q_san.changed,
+            sanitized_document=self._d_san.changed,
+            dropped_sentences=self._dropped,
+            generation_cached=self._cached,
+        )
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import replace
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+
+import httpx
+
+from .generation import AsyncOllamaClient, OllamaConfig, load_ollama_config
+
+
+def load_backend_urls() -> List[str]:
+    """OLLAMA_BASE_URLS (comma-separated), else the single OLLAMA_BASE_URL."""
+    raw = os.getenv("OLLAMA_BASE_URLS", "")
+    urls = [u.strip().rstrip("/") for u in raw.split(",") if u.strip()]
+    return urls or [load_ollama_config().base_url]
+
+
+def _is_backend_failure(exc: BaseException) -> bool:
+    # the server is down / overloaded, as opposed to a bad request
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _retryable(exc: BaseException) -> bool:
+    # failed fast, before the backend did any work: safe to try another one.
+    # A read timeout already cost a full timeout_s, so it is not retried.
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class Backend:
+    """One Ollama endpoint: its client plus the load / health state the pool routes on."""
+    def __init__(self, cfg: OllamaConfig):
+        self.url = cfg.base_url
+        self.client = AsyncOllamaClient(cfg)
+        self.inflight = 0
+        self.ewma_s: Optional[float] = None  # recent request latency
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0  # monotonic; 0 = healthy
+        self.eject_s = 0.0  # current ejection period (doubles while the backend keeps failing)
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def healthy(self) -> bool:
+        return self.ejected_until == 0.0
+
+
+class OllamaBackendPool:
+    """
+    Drop-in for AsyncOllamaClient that spreads generations over several
+    Ollama servers.
+
+      routing   least expected wait: (in-flight + 1) x recent latency (EWMA),
+                among backends below max_inflight; callers queue when all are full
+      ejection  fail_threshold consecutive failures (connect errors, timeouts,
+                5xx) eject a backend for eject_s, doubling up to max_eject_s
+      re-probe  once the period ends, a GET /api/tags decides whether it
+                rejoins; until then it only serves if every backend is ejected
+    Fast failures (connection refused, 5xx) are retried on another backend;
+    a stream is only retried before its first fragment.
+    """
+    def __init__(
+        self,
+        urls: Sequence[str],
+        cfg: Optional[OllamaConfig] = None,
+        *,
+        max_inflight: int = 8,
+        fail_threshold: int = 2,
+        eject_s: float = 10.0,
+        max_eject_s: float = 300.0,
+        probe_timeout_s: float = 2.0,
+        ewma_alpha: float = 0.2,
+    ):
+        if not urls:
+            raise ValueError("at least one backend URL is required")
+        self.cfg = cfg or load_ollama_config()  # model + options: shared, so cache keys do not depend on the backend
+        self.backends = [Backend(replace(self.cfg, base_url=u.rstrip("/"))) for u in urls]
+        self.max_inflight = max_inflight
+        self.fail_threshold = fail_threshold
+        self.base_eject_s = eject_s
+        self.max_eject_s = max_eject_s
+        self.probe_timeout_s = probe_timeout_s
+        self.ewma_alpha = ewma_alpha
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # bound to the running loop, rebuilt like AsyncOllamaClient's pool
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+        return self._cond
+
+    def _has_room(self, b: Backend) -> bool:
+        return self.max_inflight <= 0 or b.inflight < self.max_inflight
+
+    def _expected_wait(self, b: Backend) -> float:
+        known = [x.ewma_s for x in self.backends if x.ewma_s is not None]
+        # an unmeasured backend is assumed average, so it gets traffic right away
+        lat = b.ewma_s if b.ewma_s is not None else (sum(known) / len(known) if known else 1.0)
+        return (b.inflight + 1) * lat
+
+    async def _probe(self, b: Backend) -> None:
+        b.probing = True
+        try:
+            r = await b.client._http().get("/api/tags", timeout=self.probe_timeout_s)
+            r.raise_for_status()
+        except Exception:
+            self._eject(b)
+        else:
+            b.ejected_until = 0.0
+            b.eject_s = 0.0
+            b.failures = 0
+        finally:
+            b.probing = False
+
+    async def _acquire(self, exclude: Sequence[Backend] = ()) -> Backend:
+        cond = self._condition()
+        while True:
+            now = time.monotonic()
+            due = [b for b in self.backends if not b.healthy() and not b.probing and now >= b.ejected_until]
+            if due:
+                await asyncio.gather(*(self._probe(b) for b in due))
+
+            async with cond:
+                fresh = [b for b in self.backends if b not in exclude]
+                candidates = [b for b in fresh if b.healthy()]
+                if not candidates and fresh and not any(b.healthy() for b in self.backends):
+                    # everything is ejected: better to try one than to fail outright
+                    candidates = [min(fresh, key=lambda b: b.ejected_until)]
+                if not candidates:
+                    raise RuntimeError("no Ollama backend available")
+
+                open_ = [b for b in candidates if self._has_room(b)]
+                if open_:
+                    b = min(open_, key=self._expected_wait)
+                    b.inflight += 1
+                    b.requests += 1
+                    return b
+                await cond.wait()
+
+    async def _release(self, b: Backend, started: float, exc: Optional[BaseException]) -> None:
+        b.inflight -= 1
+        if exc is None:
+            dt = time.perf_counter() - started
+            b.ewma_s = dt if b.ewma_s is None else (1 - self.ewma_alpha) * b.ewma_s + self.ewma_alpha * dt
+            b.failures = 0
+            b.ejected_until = 0.0  # served while ejected (all were down) and it worked
+            b.eject_s = 0.0
+        elif _is_backend_failure(exc):
+            b.errors += 1
+            b.failures += 1
+            if b.healthy():
+                if b.failures >= self.fail_threshold:
+                    self._eject(b)
+            elif time.monotonic() >= b.ejected_until:
+                self._eject(b)  # was serving as the last resort: back off further
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+    def _eject(self, b: Backend) -> None:
+        b.eject_s = min(self.max_eject_s, b.eject_s * 2) if b.eject_s else self.base_eject_s
+        b.ejected_until = time.monotonic() + b.eject_s
+
+    async def generate(self, prompt: str, *, num_ctx: Optional[int] = None) -> str:
+        tried: List[Backend] = []
+        while True:
+            b = await self._acquire(tried)
+            tried.append(b)
+            started = time.perf_counter()
+            try:
+                text = await b.client.generate(prompt, num_ctx=num_ctx)
+            except BaseException as e:
+                await asyncio.shield(self._release(b, started, e))
+                if isinstance(e, Exception) and _retryable(e) and len(tried) < len(self.backends):
+                    continue
+                raise
+            await self._release(b, started, None)
+            return text
+
+    async def stream(self, prompt: str, *, num_ctx: Optional[int] = None) -> AsyncIterator[str]:
+        tried: List[Backend] = []
+        while True:
+            b = await self._acquire(tried)
+            tried.append(b)
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for piece in b.client.stream(prompt, num_ctx=num_ctx):
+                    emitted = True
+                    yield piece
+            except BaseException as e:
+                await asyncio.shield(self._release(b, started, e))
+                if isinstance(e, Exception) and not emitted and _retryable(e) and len(tried) < len(self.backends):
+                    continue
+                raise
+            await self._release(b, started, None)
+            return
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": b.url,
+                "healthy": b.healthy(),
+                "ejected_for_s": round(max(0.0, b.ejected_until - now), 1) if not b.healthy() else 0.0,
+                "inflight": b.inflight,
+                "latency_ms": int(b.ewma_s * 1000) if b.ewma_s is not None else None,
+                "requests": b.requests,
+                "errors": b.errors,
+            }
+            for b in self.backends
+        ]
+
+    async def aclose(self) -> None:
+        for b in self.backends:
+            await b.client.aclose()
+
+
+# Anything answering can generate with: one server or a pool of them
+GenerationClient = Union[AsyncOllamaClient, OllamaBackendPool]
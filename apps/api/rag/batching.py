@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embeddings import Embedder
+
+_Pending = Tuple[str, "Future[np.ndarray]"]
+
+
+class BatchingEmbedder:
+    """
+    Drop-in wrapper around Embedder that micro-batches embed_query() calls
+    coming from concurrent requests.
+
+    A single worker thread takes the first waiting query, keeps collecting
+    for up to max_wait_ms (or until max_batch queries), then encodes them
+    all with one embed_queries() call and hands each caller its own row.
+    embed_texts() (document chunks) is passed straight through.
+    """
+    def __init__(self, embedder: Embedder, *, max_batch: int = 32, max_wait_ms: float = 2.0):
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+
+        self._q: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()  # no query may be enqueued behind the stop sentinel
+        self._batches = 0
+        self._queries = 0
+        self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._thread.start()
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self.embedder.embed_texts(texts)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self.embedder.embed_queries(texts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        fut: "Future[np.ndarray]" = Future()
+        with self._close_lock:
+            closed = self._closed
+            if not closed:
+                self._q.put((text, fut))
+        if closed:
+            return self.embedder.embed_query(text)
+        return fut.result()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch": (self._queries / self._batches) if self._batches else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._q.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first: _Pending) -> Tuple[List[_Pending], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._q.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+
+            try:
+                vecs = self.embedder.embed_queries([text for text, _ in batch])
+            except Exception as e:  # surface the failure to every waiting caller
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self._batches += 1
+            self._queries += len(batch)
+            for i, (_, fut) in enumerate(batch):
+                fut.set_result(vecs[i])
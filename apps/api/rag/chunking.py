@@ -1,5 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
+import re
 from typing import List
 
 
@@ -11,46 +12,29 @@ class Chunk:
     text: str
 
 
+# blank line = "\n", optional "\r", "\n"; plus any newline run after it (leading newlines of the next paragraph)
+_BLANK_LINE_RE = re.compile(r"\n\r?\n[\r\n]*")
+_LEADING_NL_RE = re.compile(r"[\r\n]*")
+_NON_WS_RE = re.compile(r"\S")
+
+
 def _iter_paragraph_spans(text: str) -> List[tuple[int, int]]:
     """
     Split by blank lines but preserve exact character offsets.
     Paragraph span = [start, end) over original text.
+
+    Single pass with C-level regex scanning (no per-character Python loop).
     """
     spans: List[tuple[int, int]] = []
     n = len(text)
-    i = 0
-
-    while i < n:
-        # skip leading newlines
-        while i < n and text[i] in ("\n", "\r"):
-            i += 1
-        if i >= n:
-            break
-
-        start = i
-        # paragraph goes until next blank line
-        while i < n:
-            # detect blank line: '\n\n' (handle Windows '\r\n' too)
-            if text[i] == "\n":
-                # lookahead for another newline (possibly with \r in between)
-                j = i
-                # consume one newline
-                j += 1
-                # optional \r
-                if j < n and text[j] == "\r":
-                    j += 1
-                # second newline?
-                if j < n and text[j] == "\n":
-                    end = i
-                    spans.append((start, end))
-                    i = j + 1
-                    break
-            i += 1
-        else:
-            # reached end
-            spans.append((start, n))
-            break
+    i = _LEADING_NL_RE.match(text).end()
+
+    for m in _BLANK_LINE_RE.finditer(text, i):
+        spans.append((i, m.start()))
+        i = m.end()
 
+    if i < n:
+        spans.append((i, n))
     return spans
 
 
@@ -77,7 +61,7 @@ def chunk_document(document_text: str, *, max_chars: int = 900, overlap_chars: i
         if buf_start is None or buf_end is None:
             return
         text = document_text[buf_start:buf_end]
-        if text.strip():
+        if _NON_WS_RE.search(text):
             chunks.append(
                 Chunk(
                     chunk_id=f"c{chunk_idx:04d}",
@@ -92,8 +76,8 @@ def chunk_document(document_text: str, *, max_chars: int = 900, overlap_chars: i
         buf_parts = []
 
     for (p_start, p_end) in spans:
-        para = document_text[p_start:p_end].strip()
-        if not para:
+        # whitespace-only paragraph? (search in place instead of slice + strip)
+        if _NON_WS_RE.search(document_text, p_start, p_end) is None:
             continue
 
         # If paragraph is too large, cut it into windows
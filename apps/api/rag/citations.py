@@ -5,6 +5,7 @@ from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
 from .chunking import Chunk
+from .tracing import span
 
 
 _BRACKET_RE = re.compile(r"\[([^\]]+)\]")
@@ -22,6 +23,20 @@ def split_sentences(text: str) -> List[str]:
     return parts
 
 
+def split_complete_sentences(text: str) -> Tuple[List[str], str]:
+    """
+    Streaming twin of split_sentences(): returns (complete sentences, remainder).
+    Only text before the LAST boundary is final; whatever follows it may still
+    grow as more tokens arrive, so it is handed back to be buffered.
+    """
+    last = None
+    for last in _SENT_SPLIT_RE.finditer(text):
+        pass
+    if last is None:
+        return [], text
+    return split_sentences(text[: last.start()]), text[last.end():]
+
+
 def parse_sentence_citations(sentence: str) -> ParsedSentence:
     """
     Extract chunk ids from bracket groups like:
@@ -60,7 +75,10 @@ def enforce_citations(generated_text: str, *, chunks_by_id: Dict[str, Chunk]) ->
     """
     out: List[Tuple[str, List[Tuple[str,int,int]]]] = []
 
-    for sent in split_sentences(generated_text):
+    with span("citations.split"):
+        sentences = split_sentences(generated_text)
+
+    for sent in sentences:
         sent = sent.strip()
         # require citations to appear at the end of the sentence
         # e.g. "... blah blah [c0001, c0002]"
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex, _grown
+from .chunking import Chunk, chunk_document
+from .embeddings import Embedder
+from .index_store import DiskIndexStore
+
+_DOC_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+@dataclass(frozen=True)
+class CorpusHit:
+    doc_id: str
+    chunk: Chunk  # offsets are relative to that document's original text
+    score: float
+
+
+class Corpus:
+    """
+    Multi-document store: every ingested document is chunked + embedded into
+    one shared IVFIndex. Per-row metadata (document, start, end) lives in
+    compact int arrays, so a hit resolves back to its document id and
+    original character offsets (citations keep working).
+
+    With `root`, documents persist as:
+      <root>/docs/<doc_id>.txt       raw text (offsets are into this)
+      <root>/index/...               chunk spans + float32 vectors (DiskIndexStore)
+      <root>/manifest.jsonl          ingest order
+    and the ANN index is rebuilt from them on startup.
+    """
+    def __init__(self, root: Optional[str] = None, *, n_probe: int = 16, min_train_size: int = 4096):
+        self.root = root
+        self._lock = threading.RLock()
+        self._index: Optional[IVFIndex] = None
+        self._n_probe = n_probe
+        self._min_train_size = min_train_size
+
+        self._doc_ids: List[str] = []
+        self._texts: Dict[str, str] = {}
+        self._chunk_ids: List[List[str]] = []  # per document
+        # per-row metadata; buffers grow by doubling, rows [0, _n_rows) are live
+        self._n_rows = 0
+        self._row_doc = np.zeros((0,), dtype=np.int32)
+        self._row_chunk = np.zeros((0,), dtype=np.int32)
+        self._row_span = np.zeros((0, 2), dtype=np.int64)
+
+        self._store = DiskIndexStore(os.path.join(root, "index")) if root else None
+        self._manifest_lock = threading.Lock()  # persistence runs outside _lock
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._doc_ids),
+                "chunks": self._n_rows,
+                "ann_lists": int(len(self._index.centroids)) if self._index is not None and self._index.trained else 0,
+            }
+
+    def ingest(self, document_text: str, embedder: Embedder, *, doc_id: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Chunk + embed + index one document. Returns (doc_id, n_chunks).
+        doc_id defaults to sha256(document_text); re-ingesting identical text is a no-op.
+        Raises ValueError for a bad doc_id or a doc_id already used by different text.
+        """
+        doc_id = doc_id or hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+        if not _DOC_ID_RE.match(doc_id):
+            raise ValueError("doc_id must match [A-Za-z0-9_.-]{1,128}")
+
+        with self._lock:
+            n = self._existing(doc_id, document_text)
+            if n is not None:
+                return doc_id, n
+
+        chunks = chunk_document(document_text)
+        mat = embedder.embed_texts([c.text for c in chunks])
+
+        with self._lock:
+            n = self._existing(doc_id, document_text)  # another ingest of this doc_id may have won meanwhile
+            if n is not None:
+                return doc_id, n
+            self._add(doc_id, document_text, chunks, mat)
+        if self.root:
+            # disk writes do not hold up searches; files are per doc_id, the manifest has its own lock
+            self._persist(doc_id, document_text, chunks, mat, embedder.model_name)
+        return doc_id, len(chunks)
+
+    def _existing(self, doc_id: str, text: str) -> Optional[int]:
+        """Chunk count if doc_id is already stored with this text, None if unused; caller holds _lock."""
+        existing = self._texts.get(doc_id)
+        if existing is None:
+            return None
+        if existing != text:
+            raise ValueError(f"doc_id {doc_id!r} already exists with different text")
+        return len(self._chunk_ids[self._doc_ids.index(doc_id)])
+
+    def _add(self, doc_id: str, text: str, chunks: List[Chunk], mat: np.ndarray) -> None:
+        doc_idx = len(self._doc_ids)
+        self._doc_ids.append(doc_id)
+        self._texts[doc_id] = text
+        self._chunk_ids.append([c.chunk_id for c in chunks])
+        if not chunks:
+            return
+
+        if self._index is None:
+            self._index = IVFIndex(mat.shape[1], n_probe=self._n_probe, min_train_size=self._min_train_size)
+        self._index.add(mat)
+
+        lo, hi = self._n_rows, self._n_rows + len(chunks)
+        self._row_doc = _grown(self._row_doc, lo, hi)
+        self._row_chunk = _grown(self._row_chunk, lo, hi)
+        self._row_span = _grown(self._row_span, lo, hi)
+        self._row_doc[lo:hi] = doc_idx
+        self._row_chunk[lo:hi] = np.arange(len(chunks))
+        self._row_span[lo:hi] = [(c.start, c.end) for c in chunks]
+        self._n_rows = hi
+
+    def search(self, q: np.ndarray, k: int = 5) -> List[CorpusHit]:
+        with self._lock:
+            if self._index is None or len(self._index) == 0:
+                return []
+            rows, scores = self._index.search(q, k)
+            hits: List[CorpusHit] = []
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                d = int(self._row_doc[row])
+                doc_id = self._doc_ids[d]
+                start, end = (int(x) for x in self._row_span[row])
+                chunk = Chunk(
+                    chunk_id=self._chunk_ids[d][int(self._row_chunk[row])],
+                    start=start,
+                    end=end,
+                    text=self._texts[doc_id][start:end],
+                )
+                hits.append(CorpusHit(doc_id=doc_id, chunk=chunk, score=float(score)))
+            return hits
+
+    # ---- persistence ----
+    def _persist(self, doc_id: str, text: str, chunks: List[Chunk], mat: np.ndarray, model_name: str) -> None:
+        os.makedirs(os.path.join(self.root, "docs"), exist_ok=True)
+        with open(os.path.join(self.root, "docs", f"{doc_id}.txt"), "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        self._store.save(doc_id, chunks, mat, model_name=model_name, n_chars=len(text))
+        with self._manifest_lock, open(os.path.join(self.root, "manifest.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"doc_id": doc_id, "model": model_name}) + "\n")
+
+    def load(self, embedder: Embedder) -> int:
+        """
+        Rebuild the in-memory corpus + ANN index from `root`.
+        Documents whose vectors are missing / stale are re-embedded.
+        Returns the number of documents loaded.
+        """
+        if not self.root:
+            return 0
+        manifest = os.path.join(self.root, "manifest.jsonl")
+        if not os.path.exists(manifest):
+            return 0
+
+        with open(manifest, "r", encoding="utf-8") as f:
+            doc_ids = [json.loads(line)["doc_id"] for line in f if line.strip()]
+
+        with self._lock:
+            for doc_id in dict.fromkeys(doc_ids):  # de-dup, keep order
+                if doc_id in self._texts:
+                    continue
+                try:
+                    with open(os.path.join(self.root, "docs", f"{doc_id}.txt"), "r", encoding="utf-8", newline="") as f:
+                        text = f.read()
+                except OSError:
+                    continue
+                loaded = self._store.load(doc_id, text, model_name=embedder.model_name)
+                if loaded is None:
+                    chunks = chunk_document(text)
+                    mat = embedder.embed_texts([c.text for c in chunks])
+                    self._store.save(doc_id, chunks, mat, model_name=embedder.model_name, n_chars=len(text))
+                else:
+                    chunks, mat = loaded
+                self._add(doc_id, text, chunks, np.asarray(mat, dtype=np.float32))
+            return len(self._doc_ids)
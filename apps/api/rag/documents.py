@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .index_store import DiskIndexStore
+
+logger = logging.getLogger(__name__)
+
+_HANDLE_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def document_handle(document_text: str) -> str:
+    """Stable handle for a document: sha256 of its text (same key as DocIndexCache)."""
+    return hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+
+
+class DocumentRegistry:
+    """
+    Uploaded documents by handle, so follow-up questions can send a 64-char
+    handle instead of the whole text (no re-upload, re-validation, re-hash).
+
+    LRU bounded by total characters held. With a `store` (the DiskIndexStore
+    of TRUSTCITE_INDEX_DIR) the text is also saved there, so a handle issued
+    by one worker process resolves in every other one, and after eviction
+    or a restart (load). Without a store, handles live in this process only.
+    An unknown handle resolves to None; the client re-uploads and gets the
+    same handle back.
+    """
+    def __init__(self, max_chars: int = 64 * 1024 * 1024, *, store: Optional[DiskIndexStore] = None):
+        self.max_chars = max_chars
+        self.store = store
+        self._docs: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def put(self, document_text: str) -> str:
+        """Hold the text under its handle. With a store this writes a file: call off the event loop."""
+        handle = document_handle(document_text)
+        if self.store is not None:
+            try:
+                self.store.save_text(handle, document_text)
+            except OSError as e:  # best-effort: the handle still works in this process
+                logger.warning("documents: disk write failed: %s", e)
+        self._hold(handle, document_text)
+        return handle
+
+    def _hold(self, handle: str, document_text: str) -> None:
+        with self._lock:
+            if handle in self._docs:
+                self._docs.move_to_end(handle)
+                return
+            self._docs[handle] = document_text
+            self._chars += len(document_text)
+            while self._chars > self.max_chars and len(self._docs) > 1:
+                _, old = self._docs.popitem(last=False)
+                self._chars -= len(old)
+                self._evictions += 1
+
+    def get(self, handle: str) -> Optional[str]:
+        """Text held in memory, or None."""
+        if not _HANDLE_RE.match(handle):
+            return None
+        with self._lock:
+            text = self._docs.get(handle)
+            if text is not None:
+                self._docs.move_to_end(handle)
+            return text
+
+    def load(self, handle: str) -> Optional[str]:
+        """get(), falling back to the store (reads a file: call off the event loop)."""
+        text = self.get(handle)
+        if text is not None or self.store is None or not _HANDLE_RE.match(handle):
+            return text
+        text = self.store.load_text(handle)
+        if text is None or document_handle(text) != handle:  # missing, or not what was uploaded
+            return None
+        self._hold(handle, text)
+        return text
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"documents": len(self._docs), "chars": self._chars, "evictions": self._evictions}
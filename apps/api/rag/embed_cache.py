@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ChunkEmbeddingCache:
+    """
+    Content-addressed cache of single embedding rows, keyed by
+    hash(model_name, chunk_text), shared across ALL documents.
+
+    Boilerplate (legal footers, standard clauses, templates) is embedded
+    once and then assembled into every new document's matrix from cache.
+    LRU, bounded by bytes of stored vectors.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._rows: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(model_name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.digest()
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for k in keys:
+                row = self._rows.get(k)
+                if row is None:
+                    self._misses += 1
+                else:
+                    self._rows.move_to_end(k)
+                    self._hits += 1
+                out.append(row)
+        return out
+
+    def put_many(self, items: List[Tuple[bytes, np.ndarray]]) -> None:
+        with self._lock:
+            for k, row in items:
+                if k in self._rows:
+                    continue
+                row = np.array(row, dtype=np.float32, copy=True)  # own the memory (not a view of a big matrix)
+                self._rows[k] = row
+                self._bytes += row.nbytes
+            while self._bytes > self.max_bytes and self._rows:
+                _, old = self._rows.popitem(last=False)
+                self._bytes -= old.nbytes
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "items": len(self._rows),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
@@ -1,29 +1,57 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional
 import numpy as np
 
 # SentenceTransformers is CPU-friendly for MiniLM
 from sentence_transformers import SentenceTransformer
 
+from .embed_cache import ChunkEmbeddingCache
+
 
 @dataclass
 class Embedder:
     model_name: str
     _model: SentenceTransformer
+    text_cache: Optional[ChunkEmbeddingCache] = None
 
     @classmethod
-    def load(cls, model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> "Embedder":
+    def load(
+        cls,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        *,
+        text_cache: Optional[ChunkEmbeddingCache] = None,
+    ) -> "Embedder":
         model = SentenceTransformer(model_name)
-        return cls(model_name=model_name, _model=model)
+        return cls(model_name=model_name, _model=model, text_cache=text_cache)
 
     def embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Returns float32 matrix (n, d), L2-normalized for cosine via dot-product.
+        With a text_cache, only texts never seen before (by content) are encoded.
         """
         if not texts:
             return np.zeros((0, 384), dtype=np.float32)
+        if self.text_cache is None:
+            return self._encode(texts)
+
+        keys = [ChunkEmbeddingCache.key(self.model_name, t) for t in texts]
+        rows = self.text_cache.get_many(keys)
+
+        # encode each distinct missing text once (duplicates inside one doc too)
+        todo: Dict[bytes, str] = {}
+        for k, t, row in zip(keys, texts, rows):
+            if row is None:
+                todo.setdefault(k, t)
+        if todo:
+            fresh = self._encode(list(todo.values()))
+            new_rows = dict(zip(todo.keys(), fresh))
+            self.text_cache.put_many(list(new_rows.items()))
+            rows = [new_rows[k] if row is None else row for k, row in zip(keys, rows)]
+
+        return np.stack(rows).astype(np.float32, copy=False)
 
+    def _encode(self, texts: List[str]) -> np.ndarray:
         vecs = self._model.encode(
             texts,
             batch_size=32,
@@ -34,11 +62,21 @@ class Embedder:
         return vecs.astype(np.float32)
 
     def embed_query(self, text: str) -> np.ndarray:
-        vec = self._model.encode(
-            [text],
-            batch_size=1,
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode many queries in ONE forward pass (batch = all of them).
+        Returns float32 matrix (n, d), L2-normalized.
+        """
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+
+        vecs = self._model.encode(
+            texts,
+            batch_size=len(texts),
             show_progress_bar=False,
             convert_to_numpy=True,
             normalize_embeddings=True,
-        )[0]
-        return vec.astype(np.float32)
+        )
+        return vecs.astype(np.float32)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .index_store import _atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCache:
+    """
+    Cache of LLM responses keyed by hash(model, options, prompt).
+
+    The prompt already embeds the (sanitized) question and the exact
+    retrieved evidence, so a hit means the model would be asked the very
+    same thing again; we return the stored text instead.
+
+      memory  LRU of up to max_items responses
+      disk    optional, one JSON file per key under <root>/<key[:2]>/,
+              survives restarts and is shared by workers on one host;
+              best-effort (write errors are logged, never raised) and
+              pruned to ~90% of max_disk_items, oldest files first
+    ttl_s (optional) expires entries in both tiers.
+    """
+    def __init__(
+        self,
+        max_items: int = 1024,
+        *,
+        root: Optional[str] = None,
+        ttl_s: Optional[float] = None,
+        max_disk_items: int = 100_000,
+    ):
+        self.max_items = max_items
+        self.root = root
+        self.ttl_s = ttl_s
+        self.max_disk_items = max_disk_items
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (text, created wall time)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._disk_errors = 0
+        self._disk_pruned = 0
+        self._disk_items = 0  # files on disk, approximate between prunes (other workers write too)
+        self._prune_lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+            self._disk_items = len(self._disk_files())
+
+    @staticmethod
+    def key(model: str, options: Dict[str, Any], prompt: str) -> str:
+        blob = json.dumps({"model": model, "options": options, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_s is not None and time.time() - created_at > self.ttl_s
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                if not self._expired(item[1]):
+                    self._mem.move_to_end(key)
+                    self._hits += 1
+                    return item[0]
+                del self._mem[key]
+
+        item = self._disk_get(key)
+        with self._lock:
+            if item is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._mem_put(key, item)
+        return item[0]
+
+    def put(self, key: str, text: str) -> None:
+        item = (text, time.time())
+        with self._lock:
+            self._mem_put(key, item)
+        if not self.root:
+            return
+        path = self._path(key)
+        payload = json.dumps({"text": text, "created_at": item[1]}).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, lambda f: f.write(payload))
+        except OSError as e:
+            # disk tier is best-effort; the answer is already generated and in memory
+            with self._lock:
+                self._disk_errors += 1
+            logger.warning("generation cache: disk write failed: %s", e)
+            return
+        with self._lock:
+            self._disk_items += 1
+            over = self._disk_items > self.max_disk_items
+        if over:
+            self._prune_disk()
+
+    def _disk_files(self) -> List[Tuple[float, str]]:
+        """(mtime, path) of every entry file; vanished files are skipped."""
+        out: List[Tuple[float, str]] = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith(".json"):
+                    try:
+                        out.append((f.stat().st_mtime, f.path))
+                    except OSError:
+                        pass
+        return out
+
+    def _prune_disk(self) -> None:
+        if not self._prune_lock.acquire(blocking=False):
+            return  # another thread is already pruning
+        try:
+            files = sorted(self._disk_files())
+            keep = int(self.max_disk_items * 0.9)
+            doomed = files[: max(0, len(files) - keep)]
+            if self.ttl_s is not None:
+                cutoff = time.time() - self.ttl_s
+                doomed += [f for f in files[len(doomed):] if f[0] < cutoff]
+            removed = 0
+            for _, path in doomed:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_items = len(files) - removed
+                self._disk_pruned += removed
+        except OSError as e:
+            logger.warning("generation cache: disk prune failed: %s", e)
+        finally:
+            self._prune_lock.release()
+
+    def _mem_put(self, key: str, item: Tuple[str, float]) -> None:
+        self._mem[key] = item
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        if not self.root:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            item = (str(data["text"]), float(data["created_at"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if self._expired(item[1]):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        return item
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "items": len(self._mem),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "disk_items": self._disk_items,
+                "disk_pruned": self._disk_pruned,
+                "disk_errors": self._disk_errors,
+            }
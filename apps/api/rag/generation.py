@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-import requests
+import httpx
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .gen_cache import GenerationCache
 
 
 @dataclass(frozen=True)
@@ -11,37 +15,109 @@ class OllamaConfig:
     base_url: str
     model: str
     timeout_s: int = 120
+    max_connections: int = 256
 
 
 def load_ollama_config() -> OllamaConfig:
     base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
     model = os.getenv("OLLAMA_MODEL", "qwen2.5:7b-instruct")
-    return OllamaConfig(base_url=base_url, model=model)
+    max_connections = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "256"))
+    return OllamaConfig(base_url=base_url, model=model, max_connections=max_connections)
+
+
+def _generate_payload(prompt: str, cfg: OllamaConfig, *, stream: bool = False, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "model": cfg.model,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": "2h",
+        # You can tune:
+        "options": {
+            "temperature": 0.1,
+            "top_p": 0.9,
+            "num_ctx": num_ctx or 4096,
+        },
+    }
 
 
-def ollama_generate(prompt: str, *, cfg: Optional[OllamaConfig] = None) -> str:
+def generation_cache_key(prompt: str, cfg: OllamaConfig, *, num_ctx: Optional[int] = None) -> str:
+    """GenerationCache key: hash(model, sampling options, prompt)."""
+    return GenerationCache.key(cfg.model, _generate_payload(prompt, cfg, num_ctx=num_ctx)["options"], prompt)
+
+
+class AsyncOllamaClient:
     """
-    Returns the full generated text (non-streaming).
-    Raises requests.HTTPError on non-2xx responses.
+    Non-blocking Ollama client over one pooled keep-alive httpx.AsyncClient,
+    so an in-flight generation costs a socket, not a threadpool worker.
+
+    The pool is bound to the event loop it was created on; if called from a
+    different loop (e.g. TestClient without a context manager) it is rebuilt
+    and the old one closed on its own loop (or dropped, if that loop is gone).
     """
-    cfg = cfg or load_ollama_config()
-
-    r = requests.post(
-        f"{cfg.base_url}/api/generate",
-        json={
-            "model": cfg.model,
-            "prompt": prompt,
-            "stream": False,
-            "keep_alive": "2h",
-            # You can tune:
-            "options": {
-                "temperature": 0.1,
-                "top_p": 0.9,
-                "num_ctx": 4096,
-            },
-        },
-        timeout=(5, cfg.timeout_s),
-    )
-    r.raise_for_status()
-    data = r.json()
-    return (data.get("response") or "").strip()
\ No newline at end of file
+    def __init__(self, cfg: Optional[OllamaConfig] = None):
+        self.cfg = cfg or load_ollama_config()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                _discard(self._client, self._loop)
+                self._client = None
+            self._client = httpx.AsyncClient(
+                base_url=self.cfg.base_url,
+                timeout=httpx.Timeout(self.cfg.timeout_s, connect=5),
+                limits=httpx.Limits(
+                    max_connections=self.cfg.max_connections,
+                    max_keepalive_connections=self.cfg.max_connections,
+                ),
+            )
+            self._loop = loop
+        return self._client
+
+    async def generate(self, prompt: str, *, num_ctx: Optional[int] = None) -> str:
+        """
+        Returns the full generated text (non-streaming).
+        Raises httpx.HTTPStatusError on non-2xx responses.
+        """
+        r = await self._http().post("/api/generate", json=_generate_payload(prompt, self.cfg, num_ctx=num_ctx))
+        r.raise_for_status()
+        data = r.json()
+        return (data.get("response") or "").strip()
+
+    async def stream(self, prompt: str, *, num_ctx: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yields response fragments as Ollama produces them ("stream": true,
+        one JSON object per line). Raises httpx.HTTPStatusError on non-2xx.
+        """
+        payload = _generate_payload(prompt, self.cfg, stream=True, num_ctx=num_ctx)
+        async with self._http().stream("POST", "/api/generate", json=payload) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama stream error: {data['error']}")
+                piece = data.get("response") or ""
+                if piece:
+                    yield piece
+                if data.get("done"):
+                    break
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+def _discard(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """
+    Close a client left behind by another event loop, without blocking this
+    one. If that loop is gone, its connections cannot be awaited closed; the
+    caller drops the client and the sockets go with it.
+    """
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .chunking import Chunk
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+_SLUG_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class DiskIndexStore:
+    """
+    Persistent tier behind DocIndexCache, keyed by the same sha256(document_text).
+
+    Layout (one directory per embedding model):
+      <root>/<model>/<key>.vec.npy    float32 (n, d) embedding matrix
+      <root>/<model>/<key>.spans.npy  int64 (n, 2) chunk [start, end) offsets
+      <root>/<model>/<key>.json       metadata (written last = entry is complete)
+      <root>/_documents/<key>.txt     uploaded text (doc_handle = key), shared by workers
+
+    Matrices are opened with mmap_mode="r", so warm loads skip embedding and
+    every worker process maps the same page-cache copy of the vectors.
+    Chunk text is NOT stored: offsets are re-sliced from the document_text.
+
+    max_items (0 = unbounded) caps the number of keys: past it, the store is
+    pruned to ~90%, least recently saved / loaded keys first (by mtime), all
+    files of a key together. A pruned key is a miss (re-embedded on demand).
+    """
+    def __init__(self, root: str, *, max_items: int = 0):
+        self.root = root
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._items = len(self._key_files())  # approximate between prunes (other workers write too)
+        self._pruned = 0
+
+    def _dir(self, model_name: str) -> str:
+        return os.path.join(self.root, _SLUG_RE.sub("__", model_name))
+
+    def _paths(self, key: str, model_name: str) -> Tuple[str, str, str]:
+        d = self._dir(model_name)
+        return (
+            os.path.join(d, f"{key}.vec.npy"),
+            os.path.join(d, f"{key}.spans.npy"),
+            os.path.join(d, f"{key}.json"),
+        )
+
+    def _text_path(self, key: str) -> str:
+        return os.path.join(self.root, "_documents", f"{key}.txt")
+
+    def save_text(self, key: str, document_text: str) -> None:
+        path = self._text_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, lambda f: f.write(document_text.encode("utf-8")))
+        self._added()
+
+    def load_text(self, key: str) -> Optional[str]:
+        """Text saved under key, or None (missing / unreadable)."""
+        try:
+            with open(self._text_path(key), "rb") as f:
+                return f.read().decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def load(self, key: str, document_text: str, *, model_name: str) -> Optional[Tuple[List[Chunk], np.ndarray]]:
+        """
+        Returns (chunks, read-only memory-mapped matrix) or None on miss.
+        Corrupt / mismatched entries are treated as a miss.
+        """
+        vec_path, spans_path, meta_path = self._paths(key, model_name)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != _FORMAT_VERSION or meta.get("n_chars") != len(document_text):
+                return None
+
+            mat = np.load(vec_path, mmap_mode="r")
+            spans = np.load(spans_path)
+        except (OSError, ValueError):
+            return None
+        if self.max_items > 0:
+            _touch(meta_path)  # recently used: pruned last
+
+        chunk_ids = meta.get("chunk_ids") or []
+        if mat.dtype != np.float32 or mat.ndim != 2 or mat.shape[0] != len(chunk_ids) or spans.shape != (len(chunk_ids), 2):
+            return None
+
+        chunks = [
+            Chunk(chunk_id=cid, start=int(s), end=int(e), text=document_text[int(s):int(e)])
+            for cid, (s, e) in zip(chunk_ids, spans.tolist())
+        ]
+        return chunks, mat
+
+    def save(self, key: str, chunks: List[Chunk], mat: np.ndarray, *, model_name: str, n_chars: int) -> None:
+        """
+        Atomic write: each file goes to a temp name and is os.replace()d,
+        metadata last, so concurrent readers never see a partial entry.
+        """
+        vec_path, spans_path, meta_path = self._paths(key, model_name)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        spans = np.array([(c.start, c.end) for c in chunks], dtype=np.int64).reshape(-1, 2)
+        meta = {
+            "version": _FORMAT_VERSION,
+            "model": model_name,
+            "n_chars": n_chars,
+            "dim": int(mat.shape[1]) if mat.ndim == 2 else 0,
+            "chunk_ids": [c.chunk_id for c in chunks],
+        }
+
+        _atomic_write(vec_path, lambda f: np.save(f, np.ascontiguousarray(mat, dtype=np.float32)))
+        _atomic_write(spans_path, lambda f: np.save(f, spans))
+        _atomic_write(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        self._added()
+
+    # ---- size bound ----
+    def _added(self) -> None:
+        with self._lock:
+            self._items += 1
+            over = 0 < self.max_items < self._items
+        if over:
+            self._prune()
+
+    def _key_files(self) -> Dict[str, Tuple[float, List[str]]]:
+        """key -> (newest mtime, paths) over every model directory and the documents."""
+        out: Dict[str, Tuple[float, List[str]]] = {}
+        if not os.path.isdir(self.root):
+            return out
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith(".tmp"):
+                    continue
+                try:
+                    mtime = f.stat().st_mtime
+                except OSError:
+                    continue  # vanished meanwhile
+                key = f.name.split(".", 1)[0]
+                newest, paths = out.get(key, (0.0, []))
+                paths.append(f.path)
+                out[key] = (max(newest, mtime), paths)
+        return out
+
+    def _prune(self) -> None:
+        if not self._prune_lock.acquire(blocking=False):
+            return  # another thread is already pruning
+        try:
+            keys = sorted(self._key_files().values())
+            doomed = keys[: max(0, len(keys) - int(self.max_items * 0.9))]
+            for _, paths in doomed:
+                for path in sorted(paths, key=lambda p: not p.endswith(".json")):  # metadata first: a miss from then on
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+            with self._lock:
+                self._items = len(keys) - len(doomed)
+                self._pruned += len(doomed)
+        except OSError as e:
+            logger.warning("index store: prune failed: %s", e)
+        finally:
+            self._prune_lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"items": self._items, "max_items": self.max_items, "pruned": self._pruned}
+
+
+def _touch(path: str) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _atomic_write(path: str, write: Callable[[BinaryIO], None]) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import span
+
+# Seconds. Covers sub-ms stages (score, enforce) up to slow LLM calls.
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# (name, type, labels, value) for values owned by other components, read at scrape time
+Sample = Tuple[str, str, Dict[str, str], float]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets  # per bucket, not cumulative
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, rendered in the Prometheus text
+    exposition format (no client library needed). Thread-safe: stages run
+    on the CPU pool as well as on the event loop.
+
+    Metrics are created on first use; help text is optional (describe()).
+    """
+    def __init__(self, buckets: Sequence[float] = STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._hists: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)  # le: value <= bound
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = _Histogram(len(self.buckets) + 1)
+            h.counts[i] += 1
+            h.sum += value
+            h.count += 1
+
+    @contextmanager
+    def time(self, name: str, **labels: object) -> Iterator[None]:
+        """Observe the wall time of the with-block (also when it raises)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def render(self, samples: Iterable[Sample] = ()) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name in sorted(self._counters):
+                header(name, "counter")
+                for key, v in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(v)}")
+
+            for name in sorted(self._hists):
+                header(name, "histogram")
+                for key, h in sorted(self._hists[name].items()):
+                    acc = 0
+                    for bound, n in zip(self.buckets, h.counts):
+                        acc += n
+                        lines.append(f"{name}_bucket{_fmt_labels(key, ('le', repr(bound)))} {acc}")
+                    lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {repr(h.sum)}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {h.count}")
+
+        by_name: Dict[str, Tuple[str, List[Tuple[LabelKey, float]]]] = {}
+        for name, kind, labels, value in samples:
+            by_name.setdefault(name, (kind, []))[1].append((_label_key(labels), value))
+        for name in sorted(by_name):
+            kind, series = by_name[name]
+            header(name, kind)
+            for key, v in sorted(series):
+                lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(v)}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("trustcite_stage_seconds", "Wall time per pipeline stage")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    with stage("embed_query"): ... -> trustcite_stage_seconds{stage="embed_query"},
+    plus a span of that name when the request is recording (see tracing).
+    """
+    with span(name), METRICS.time("trustcite_stage_seconds", stage=name):
+        yield
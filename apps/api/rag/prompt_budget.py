@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from typing import List, Sequence, Tuple
+
+from .retrieval import Retrieved
+
+# ASCII words; every digit / non-ASCII letter on its own (BPE vocabularies split
+# numbers and CJK far finer than words); punctuation marks
+_PIECE_RE = re.compile(r"[A-Za-z_]+|[^\W_A-Za-z]|[^\w\s]")
+
+# Context sizes we let num_ctx take. Ollama restarts the model runner whenever
+# num_ctx changes, so we round up to a few fixed sizes instead of an exact fit.
+NUM_CTX_BUCKETS = (1024, 2048, 4096, 8192)
+
+# <chunk id='c0000'>\n ... \n</chunk>\n
+_CHUNK_WRAPPER_TOKENS = 12
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap BPE-ish token estimate: one token per ASCII word / digit /
+    non-ASCII letter / punctuation mark, plus one per 5 extra characters of
+    long words, and never below one token per 4 characters. Over-counts
+    English, CJK and digit runs a little, which is the safe side for a budget.
+    """
+    return max(sum(1 + len(p) // 5 for p in _PIECE_RE.findall(text)), -(-len(text) // 4))
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest word-boundary prefix of text within max_tokens, with an ellipsis if cut."""
+    used = 0
+    end = 0
+    for m in _PIECE_RE.finditer(text):
+        used += 1 + len(m.group()) // 5
+        if used > max_tokens:
+            break
+        end = m.end()
+    else:
+        return text
+    return text[:end].rstrip() + "…"
+
+
+def pack_evidence(
+    retrieved: Sequence[Retrieved],
+    *,
+    budget_tokens: int,
+    max_chars_per_chunk: int = 900,
+    min_chunk_tokens: int = 48,
+) -> List[Tuple[Retrieved, str]]:
+    """
+    Greedy packing in retrieval rank order: each chunk (cut at
+    max_chars_per_chunk as before) goes in whole while it fits the evidence
+    budget; the first one that does not fit is trimmed to the remainder if
+    at least min_chunk_tokens are left, and everything after it is dropped.
+    The top chunk is always included (trimmed if needed).
+    """
+    packed: List[Tuple[Retrieved, str]] = []
+    remaining = budget_tokens
+    for r in retrieved:
+        text = r.chunk.text.strip()
+        if len(text) > max_chars_per_chunk:
+            text = text[:max_chars_per_chunk].rsplit(" ", 1)[0] + "…"
+        cost = estimate_tokens(text) + _CHUNK_WRAPPER_TOKENS
+        if cost <= remaining:
+            packed.append((r, text))
+            remaining -= cost
+            continue
+        room = remaining - _CHUNK_WRAPPER_TOKENS
+        if room >= min_chunk_tokens or not packed:
+            packed.append((r, _trim_to_tokens(text, max(room, min_chunk_tokens))))
+        break
+    return packed
+
+
+def num_ctx_for(prompt: str, *, budget_tokens: int, reserve_tokens: int = 512, headroom: float = 1.25) -> int:
+    """
+    Smallest NUM_CTX_BUCKETS size holding max(budget, prompt) x headroom
+    (margin for estimate error: Ollama silently drops the start of a prompt
+    that overflows) plus reserve_tokens for the answer. Sizing from the
+    budget (not each prompt) keeps num_ctx constant across requests, so
+    Ollama does not reload the model every time a prompt crosses a bucket
+    boundary.
+    """
+    need = int(max(budget_tokens, estimate_tokens(prompt)) * headroom) + reserve_tokens
+    for size in NUM_CTX_BUCKETS:
+        if need <= size:
+            return size
+    return NUM_CTX_BUCKETS[-1]
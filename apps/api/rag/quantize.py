@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+STORAGE_KINDS = ("float32", "float16", "int8")
+
+
+class QuantizedMatrix:
+    """
+    Compact stand-in for a float32 (n, d) embedding matrix.
+
+      int8:    per-row symmetric quantization, row ~= data[i] * scales[i]  (~4x smaller)
+      float16: plain half precision                                        (~2x smaller)
+
+    Supports `mat @ q` (approximate scores, same shape as the float32 path),
+    .shape, .nbytes and row indexing (dequantized float32 rows), so it can sit
+    where DocIndexCache used to keep the float32 matrix. Scoring converts
+    BLOCK rows at a time to float32, so the temporary stays small and the
+    matmul still runs in BLAS. (numpy's float16 -> float32 cast is slow, so
+    int8 is both smaller AND faster to score; see bench/bench_quantized.py.)
+
+    `exact` optionally points at the float32 source (e.g. the memory-mapped
+    disk copy) for exact re-ranking; it is not counted in nbytes.
+    """
+    BLOCK = 1024
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray] = None, *, exact: Optional[np.ndarray] = None):
+        self.data = data
+        self.scales = scales
+        self.exact = exact
+
+    @classmethod
+    def from_float32(cls, mat: np.ndarray, kind: str, *, exact: Optional[np.ndarray] = None) -> "QuantizedMatrix":
+        mat = np.asarray(mat, dtype=np.float32)
+        if kind == "float16":
+            return cls(mat.astype(np.float16), exact=exact)
+        if kind != "int8":
+            raise ValueError(f"unsupported storage kind: {kind}")
+
+        amax = np.abs(mat).max(axis=1) if mat.shape[0] else np.zeros((0,), dtype=np.float32)
+        scales = np.where(amax > 0, amax / 127.0, 1.0).astype(np.float32)
+        data = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(data, scales, exact=exact)
+
+    @property
+    def kind(self) -> str:
+        return "int8" if self.scales is not None else "float16"
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, idx) -> np.ndarray:
+        rows = self.data[idx].astype(np.float32)
+        if self.scales is not None:
+            scales = self.scales[idx]
+            rows *= scales[..., None] if rows.ndim == 2 else scales
+        return rows
+
+    def __matmul__(self, q: np.ndarray) -> np.ndarray:
+        """
+        q: (d,) -> (n,) scores, or (d, m) -> (n, m) scores.
+        """
+        q = np.asarray(q, dtype=np.float32)
+        n = self.data.shape[0]
+        out = np.empty((n,) + q.shape[1:], dtype=np.float32)
+        for s in range(0, n, self.BLOCK):
+            e = min(n, s + self.BLOCK)
+            out[s:e] = self.data[s:e].astype(np.float32) @ q
+        if self.scales is not None:
+            out *= self.scales[:, None] if out.ndim == 2 else self.scales
+        return out
+
+    def exact_rows(self, idx: Sequence[int]) -> Optional[np.ndarray]:
+        if self.exact is None:
+            return None
+        return np.asarray(self.exact[list(idx)], dtype=np.float32)
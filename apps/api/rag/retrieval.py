@@ -1,46 +1,310 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 import hashlib
+import threading
+import time
 import numpy as np
 
 from .chunking import Chunk, chunk_document
 from .embeddings import Embedder
+from .index_store import DiskIndexStore
+from .lexical import LexicalIndex, fuse_scores
+from .metrics import stage
+from .tracing import span
+from .quantize import STORAGE_KINDS, QuantizedMatrix
+from .singleflight import SingleFlight
+from .span_align import ChunkSpanIndex
 
 
 @dataclass(frozen=True)
 class Retrieved:
     chunk: Chunk
     score: float  # cosine similarity in [-1,1], usually [0,1] in practice
+    lexical: float = 0.0  # hybrid mode: share of the query's idf mass found in the chunk, [0,1]
+    span_index: Optional[ChunkSpanIndex] = field(default=None, compare=False, repr=False)  # cached, for verification
+
+
+@dataclass
+class IndexEntry:
+    chunks: List[Chunk]
+    mat: np.ndarray | QuantizedMatrix
+    nbytes: int        # budget accounting: matrix bytes + chunk text
+    created_at: float  # time.monotonic() when built / loaded
+    rows_by_hash: Dict[str, int] = field(default_factory=dict)  # chunk-text hash -> matrix row
+    lexical: Optional[LexicalIndex] = None  # BM25 inverted index (hybrid mode)
+    span_indexes: List[Optional[ChunkSpanIndex]] = field(default_factory=list)  # per row, built on first use
+
+    def span_index(self, row: int) -> ChunkSpanIndex:
+        """
+        Verification index (words, offsets, word -> positions) for one chunk.
+        Built lazily - only retrieved chunks are ever verified - and kept
+        for the entry's lifetime, so repeat questions skip re-tokenizing.
+        """
+        idx = self.span_indexes[row]
+        if idx is None:
+            idx = self.span_indexes[row] = ChunkSpanIndex(self.chunks[row].text)
+        return idx
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    builds: int = 0
+    build_ms_total: float = 0.0
+    coalesced: int = 0  # misses that waited on another caller's in-flight build
+    rows_reused: int = 0    # incremental builds: rows copied from a previous version
+    rows_embedded: int = 0  # rows that had to go through the embedder
 
 
 class DocIndexCache:
     """
     Cache doc chunking + embeddings by hash(document_text).
-    Keeps only a few entries to avoid memory growth.
+
+    Eviction is least-recently-used, bounded by entry count AND by bytes
+    (embedding matrix + chunk text), with an optional TTL. A single entry
+    larger than max_bytes is still kept (evicting it would just thrash).
+
+    Optional `store` adds a persistent tier (memory-mapped on disk) that
+    survives restarts and is shared by all worker processes.
+
+    Thread-safe: FastAPI runs sync handlers in a threadpool. Concurrent misses
+    for the same document are collapsed into a single chunk + embed build.
+
+    Incremental mode (default): an edited document gets a new sha256 key, but
+    re-chunking is cheap and most chunks come out byte-identical (with shifted
+    offsets). On a miss we match chunk-text hashes against the cached version
+    that shares the most chunks and only embed the new / changed ones.
+
+    storage="int8" / "float16" keeps matrices as QuantizedMatrix (~4x / ~2x
+    smaller, so more documents stay hot). With a disk store, retrieve_top_k
+    re-ranks the top k * rerank_factor candidates with exact float32 scores
+    from the mmap; without one it ranks on the approximate scores.
+
+    hybrid=True (opt-in) also builds a BM25 LexicalIndex per entry (compact
+    CSR arrays) so retrieve_top_k can fuse lexical and dense scores.
     """
-    def __init__(self, max_items: int = 8):
+    def __init__(
+        self,
+        max_items: int = 8,
+        store: Optional[DiskIndexStore] = None,
+        *,
+        max_bytes: Optional[int] = None,
+        ttl_s: Optional[float] = None,
+        incremental: bool = True,
+        storage: str = "float32",
+        rerank_factor: int = 4,
+        hybrid: bool = False,
+    ):
+        if storage not in STORAGE_KINDS:
+            raise ValueError(f"storage must be one of {STORAGE_KINDS}, got {storage!r}")
         self.max_items = max_items
-        self._store: Dict[str, Tuple[List[Chunk], np.ndarray]] = {}
+        self.storage = storage
+        self.rerank_factor = rerank_factor
+        self.hybrid = hybrid
+        self.incremental = incremental
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.store = store
+        self._store: "OrderedDict[str, IndexEntry]" = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+        self._flight: SingleFlight[IndexEntry] = SingleFlight()
 
     def _key(self, document_text: str) -> str:
         return hashlib.sha256(document_text.encode("utf-8")).hexdigest()
 
-    def get_or_build(self, document_text: str, embedder: Embedder) -> Tuple[List[Chunk], np.ndarray]:
-        key = self._key(document_text)
-        if key in self._store:
-            return self._store[key]
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            s = CacheStats(**vars(self._stats))
+            items, nbytes = len(self._store), self._bytes
+        lookups = s.hits + s.misses
+        return {
+            "items": items,
+            "bytes": nbytes,
+            "hits": s.hits,
+            "misses": s.misses,
+            "hit_rate": (s.hits / lookups) if lookups else 0.0,
+            "disk_hits": s.disk_hits,
+            "evictions": s.evictions,
+            "expirations": s.expirations,
+            "builds": s.builds,
+            "build_ms_avg": (s.build_ms_total / s.builds) if s.builds else 0.0,
+            "coalesced": s.coalesced,
+            "rows_reused": s.rows_reused,
+            "rows_embedded": s.rows_embedded,
+        }
+
+    def _lookup(self, key: str) -> Optional[IndexEntry]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if self.ttl_s is not None and time.monotonic() - entry.created_at > self.ttl_s:
+            self._remove(key)
+            self._stats.expirations += 1
+            return None
+        self._store.move_to_end(key)
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self._store.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
 
-        chunks = chunk_document(document_text)
-        mat = embedder.embed_texts([c.text for c in chunks])
+    def _insert(self, key: str, entry: IndexEntry) -> None:
+        self._remove(key)
+        self._store[key] = entry
+        self._bytes += entry.nbytes
 
-        # simple eviction: pop first inserted (good enough for day 2)
-        if len(self._store) >= self.max_items:
+        # evict least-recently-used until within budget (never the new entry)
+        while len(self._store) > 1 and (
+            len(self._store) > self.max_items
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
             oldest_key = next(iter(self._store.keys()))
-            self._store.pop(oldest_key, None)
+            self._remove(oldest_key)
+            self._stats.evictions += 1
+
+    def get_or_build(self, document_text: str, embedder: Embedder) -> Tuple[List[Chunk], np.ndarray | QuantizedMatrix]:
+        entry = self.get_entry(document_text, embedder)
+        return entry.chunks, entry.mat
+
+    def get_entry(self, document_text: str, embedder: Embedder, *, key: Optional[str] = None) -> IndexEntry:
+        """`key` (sha256 of document_text, e.g. a document handle) skips re-hashing the text."""
+        key = key or self._key(document_text)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self._stats.hits += 1
+                return entry
+            self._stats.misses += 1
+
+        entry, shared = self._flight.do(key, lambda: self._build(key, document_text, embedder))
+        if shared:
+            with self._lock:
+                self._stats.coalesced += 1
+        return entry
+
+    def _build(self, key: str, document_text: str, embedder: Embedder) -> IndexEntry:
+        # A previous flight may have finished between our miss and taking the lead.
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+
+        loaded = None
+        if self.store is not None:
+            loaded = self.store.load(key, document_text, model_name=embedder.model_name)
+
+        build_ms = None
+        if loaded is not None:
+            chunks, mat = loaded
+            hashes = [_chunk_hash(c.text) for c in chunks] if self.incremental else []
+        else:
+            t0 = time.perf_counter()
+            with stage("chunk"):
+                chunks = chunk_document(document_text)
+            hashes = [_chunk_hash(c.text) for c in chunks] if self.incremental else []
+            with stage("embed_docs"):
+                mat = self._embed_chunks(chunks, hashes, embedder)
+            build_ms = (time.perf_counter() - t0) * 1000
+            if self.store is not None:
+                try:
+                    self.store.save(key, chunks, mat, model_name=embedder.model_name, n_chars=len(document_text))
+                except OSError:
+                    pass  # disk tier is best-effort; never fail the request over it
+                else:
+                    if self.storage != "float32":
+                        # swap the heap copy for the mmap just written: the exact tier for re-ranking
+                        reloaded = self.store.load(key, document_text, model_name=embedder.model_name)
+                        if reloaded is not None:
+                            mat = reloaded[1]
+
+        if self.storage != "float32":
+            # keep the disk mmap (page cache, not heap) around for exact re-ranking
+            mat = QuantizedMatrix.from_float32(mat, self.storage, exact=mat if isinstance(mat, np.memmap) else None)
+
+        lexical = LexicalIndex(chunks) if self.hybrid else None
+        nbytes = int(mat.nbytes) + sum(len(c.text) for c in chunks) + (lexical.nbytes if lexical else 0)
+        entry = IndexEntry(
+            chunks=chunks,
+            mat=mat,
+            nbytes=nbytes,
+            created_at=time.monotonic(),
+            rows_by_hash={h: i for i, h in enumerate(hashes)},
+            lexical=lexical,
+            span_indexes=[None] * len(chunks),
+        )
+        with self._lock:
+            if build_ms is None:
+                self._stats.disk_hits += 1
+            else:
+                self._stats.builds += 1
+                self._stats.build_ms_total += build_ms
+            self._insert(key, entry)
+        return entry
+
+    def _embed_chunks(self, chunks: List[Chunk], hashes: List[str], embedder: Embedder) -> np.ndarray:
+        """
+        Embed chunks, reusing rows from the best-matching cached version
+        (most shared chunk hashes) when incremental mode is on.
+        """
+        base: Optional[IndexEntry] = None
+        if hashes:
+            with self._lock:
+                best = 0
+                for cand in self._store.values():
+                    shared = sum(1 for h in hashes if h in cand.rows_by_hash)
+                    if shared > best:
+                        base, best = cand, shared
+
+        if base is None:
+            mat = embedder.embed_texts([c.text for c in chunks])
+            with self._lock:
+                self._stats.rows_embedded += len(chunks)
+            return mat
+
+        # Rows are reused exactly or not at all: a quantized base only lends
+        # rows from its float32 tier, never dequantized ones (the result is
+        # saved to the disk store as the exact matrix).
+        src_mat = base.mat
+        if isinstance(src_mat, QuantizedMatrix):
+            src_mat = src_mat.exact
+        if src_mat is None:
+            mat = embedder.embed_texts([c.text for c in chunks])
+            with self._lock:
+                self._stats.rows_embedded += len(chunks)
+            return mat
+
+        reuse = [(i, base.rows_by_hash[h]) for i, h in enumerate(hashes) if h in base.rows_by_hash]
+        missing = [i for i, h in enumerate(hashes) if h not in base.rows_by_hash]
+
+        mat = np.empty((len(chunks), base.mat.shape[1]), dtype=np.float32)
+        dst, src = zip(*reuse)
+        mat[list(dst)] = np.asarray(src_mat[list(src)], dtype=np.float32)
+        if missing:
+            mat[missing] = embedder.embed_texts([chunks[i].text for i in missing])
 
-        self._store[key] = (chunks, mat)
-        return chunks, mat
+        with self._lock:
+            self._stats.rows_reused += len(reuse)
+            self._stats.rows_embedded += len(missing)
+        return mat
+
+
+def _chunk_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first."""
+    top_idx = np.argpartition(-scores, kth=k - 1)[:k]
+    return top_idx[np.argsort(-scores[top_idx])]
 
 
 def retrieve_top_k(
@@ -50,22 +314,107 @@ def retrieve_top_k(
     embedder: Embedder,
     cache: DocIndexCache,
     k: int = 5,
+    fusion: Optional[str] = None,
+    doc_key: Optional[str] = None,
+    query_vec: Optional[np.ndarray] = None,
 ) -> List[Retrieved]:
-    chunks, mat = cache.get_or_build(document_text, embedder)
+    """
+    Top-k chunks for the question. Ranking is dense cosine, or - when the
+    cache entry has a lexical index and fusion is "rrf" / "weighted" - a
+    fusion of cosine and BM25. Retrieved.score is always the cosine score.
+    doc_key: precomputed sha256 of document_text (see DocumentRegistry).
+    query_vec: precomputed embed_query(question), when the caller needs it too.
+    """
+    with span("index_lookup"):
+        entry = cache.get_entry(document_text, embedder, key=doc_key)
+    chunks, mat = entry.chunks, entry.mat
     if len(chunks) == 0 or mat.shape[0] == 0:
         return []
 
-    q = embedder.embed_query(question)  # (d,)
-    scores = mat @ q  # (n,) because normalized -> cosine similarity
+    q = query_vec
+    if q is None:
+        with stage("embed_query"):
+            q = embedder.embed_query(question)  # (d,)
+    with stage("score"):
+        scores = mat @ q  # (n,) because normalized -> cosine similarity
+        return _rank(entry, question, q, scores, k=k, fusion=fusion, rerank_factor=cache.rerank_factor)
+
+
+def retrieve_top_k_batch(
+    *,
+    questions: List[str],
+    document_text: str,
+    embedder: Embedder,
+    cache: DocIndexCache,
+    k: int = 5,
+    fusion: Optional[str] = None,
+    doc_key: Optional[str] = None,
+) -> List[List[Retrieved]]:
+    """
+    retrieve_top_k for many questions against one document: one cache lookup,
+    one embed_queries() forward pass and one (n, d) @ (d, m) score matrix.
+    """
+    if not questions:
+        return []  # before the lookup: nothing to chunk or embed the document for
+    with span("index_lookup"):
+        entry = cache.get_entry(document_text, embedder, key=doc_key)
+    if len(entry.chunks) == 0 or entry.mat.shape[0] == 0:
+        return [[] for _ in questions]
+
+    with stage("embed_query"):
+        qs = embedder.embed_queries(questions)  # (m, d)
+    with stage("score"):
+        scores = entry.mat @ np.ascontiguousarray(qs.T)  # (n, m)
+        return [
+            _rank(entry, question, qs[j], scores[:, j], k=k, fusion=fusion, rerank_factor=cache.rerank_factor)
+            for j, question in enumerate(questions)
+        ]
+
+
+def _rank(
+    entry: IndexEntry,
+    question: str,
+    q: np.ndarray,
+    scores: np.ndarray,
+    *,
+    k: int,
+    fusion: Optional[str],
+    rerank_factor: int,
+) -> List[Retrieved]:
+    """Top-k from precomputed (approximate) dense scores: exact re-rank + optional lexical fusion."""
+    chunks, mat = entry.chunks, entry.mat
 
     if k <= 0:
         k = 1
     k = min(k, len(chunks))
 
-    top_idx = np.argpartition(-scores, kth=k - 1)[:k]
-    top_idx_sorted = top_idx[np.argsort(-scores[top_idx])]
+    lexical = coverage = None
+    if fusion and entry.lexical is not None:
+        with span("lexical"):
+            lexical, coverage = entry.lexical.score(question)
+
+    if isinstance(mat, QuantizedMatrix) and mat.exact is not None:
+        # Quantized storage with an exact float32 tier (disk mmap): approximate
+        # scores shortlist k * rerank_factor candidates (per ranking), which
+        # get exact scores. Without that tier the approximate scores are used
+        # as they are; re-embedding the shortlist would cost ~20 encodes per query.
+        n_cand = min(len(chunks), k * max(1, rerank_factor))
+        cand = _top_k(scores, n_cand)
+        if lexical is not None:
+            cand = np.union1d(cand, _top_k(lexical, n_cand))
+        scores = scores.copy()
+        scores[cand] = mat.exact_rows(cand) @ q
+
+    rank = scores if lexical is None else fuse_scores(scores, lexical, method=fusion, coverage=coverage)
+    top_idx_sorted = _top_k(rank, k)
 
     out: List[Retrieved] = []
     for i in top_idx_sorted:
-        out.append(Retrieved(chunk=chunks[int(i)], score=float(scores[int(i)])))
+        i = int(i)
+        out.append(Retrieved(
+            chunk=chunks[i],
+            score=float(scores[i]),
+            lexical=float(coverage[i]) if coverage is not None else 0.0,
+            span_index=entry.span_index(i),
+        ))
     return out
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs fn(); callers arriving while it is in
+    flight block and receive the same result (or the same exception).
+    Nothing is cached once the call finishes - pair it with a cache.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[T]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Returns (result, shared) where shared=True means this caller waited
+        on another caller's execution.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
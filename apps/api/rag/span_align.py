@@ -1,80 +1,167 @@
 from __future__ import annotations
 
+import math
 import re
-from difflib import SequenceMatcher
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 _WORD_RE = re.compile(r"[A-Za-z0-9']+")
 
-def _keywords(s: str) -> list[str]:
-    words = [w.lower() for w in _WORD_RE.findall(s)]
-    # Keep useful words
-    words = [w for w in words if len(w) >= 4]
-    # de-dup preserving order
-    seen = set()
-    out = []
-    for w in words:
-        if w not in seen:
-            out.append(w)
-            seen.add(w)
-    return out[:10]
-
-def align_span(sentence: str, chunk_text: str) -> Optional[Tuple[int, int, float]]:
+# Characters of context added around the matched region (as before)
+_CONTEXT = 40
+
+# Function words: they occur in every chunk, so they neither place the window
+# nor count as support (negations and modals are kept: they carry meaning).
+_STOPWORDS = frozenset("""
+a an the of to and or in on at by for with from as into onto than then so if but
+is are was were be been being am it its it's this that these those there here
+he she they we you i his her their our your them him us me my
+has have had do does did which who whom whose what when where
+also such very just about over under per via
+within after before between during without through upon against among across around
+""".split())
+
+# Chain: at most this many content words skipped in the chunk between two
+# matched words, and each skipped character costs this much of a match.
+_MAX_GAP = 16
+_GAP_COST = 0.1
+# A sentence word the chunk has, but not in the matched passage, was likely
+# taken from another fact ("title passes on delivery"): it costs this many
+# times its weight.
+_DISPLACED_COST = 3.0
+# A chain stays in one sentence of the chunk, or runs on into the next one
+# when that opens with a pronoun referring back ("X is ... . It generates ...").
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+_BACK_REFERENCE = frozenset("it its they their this these he she his her".split())
+
+
+def _weight(tok: str) -> int:
+    return len(tok) + 1
+
+
+class ChunkSpanIndex:
+    """
+    Precomputed word index of one chunk for span alignment:
+    lowercased tokens, their [start, end) char offsets and, per token, the
+    sorted token positions where it occurs; plus the positions of content
+    (non-stopword) tokens with a prefix sum of their weights and the
+    sentence each falls in. Build once per chunk, reuse for every sentence
+    that cites it.
+    """
+    __slots__ = (
+        "text_len", "tokens", "starts", "ends", "positions",
+        "content_pos", "content_rank", "content_pre", "content_sent", "refers_back",
+    )
+
+    def __init__(self, chunk_text: str):
+        self.text_len = len(chunk_text)
+        self.tokens: List[str] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.positions: Dict[str, List[int]] = {}
+        self.content_pos: List[int] = []
+        self.content_rank: List[int] = []  # per token: index into content_pos, -1 for stopwords
+        self.content_pre: List[int] = [0]
+        self.content_sent: List[int] = []  # per content token: sentence number
+        self.refers_back: List[bool] = [False]  # per sentence: opens with a back-reference
+        text = chunk_text.lower()
+        for m in _WORD_RE.finditer(text):
+            self.tokens.append(m.group())
+            self.starts.append(m.start())
+            self.ends.append(m.end())
+        for i, tok in enumerate(self.tokens):
+            self.positions.setdefault(tok, []).append(i)
+            if i and _SENTENCE_END.search(text, self.ends[i - 1], self.starts[i] + 1):
+                self.refers_back.append(tok in _BACK_REFERENCE)
+            if tok in _STOPWORDS:
+                self.content_rank.append(-1)
+            else:
+                self.content_rank.append(len(self.content_pos))
+                self.content_pos.append(i)
+                self.content_pre.append(self.content_pre[-1] + _weight(tok))
+                self.content_sent.append(len(self.refers_back) - 1)
+
+
+def _chain(content: List[str], index: ChunkSpanIndex) -> List[Tuple[int, int]]:
+    """
+    Best in-order chain of (chunk content rank, sentence word) matches: both
+    sides strictly increasing, gaps of at most _MAX_GAP chunk words and no
+    jump into another chunk sentence (but a back-referencing next one), each
+    match worth its weight minus _GAP_COST per skipped character. Returns []
+    when no sentence word occurs in the chunk.
+    """
+    rank, pre, sent, back = index.content_rank, index.content_pre, index.content_sent, index.refers_back
+    pairs = sorted(
+        (rank[p], i)
+        for i, t in enumerate(content)
+        for p in index.positions.get(t, ())
+        if rank[p] >= 0
+    )
+    if not pairs:
+        return []
+    value: List[float] = []
+    prev: List[int] = []
+    for k, (r, i) in enumerate(pairs):
+        best_v, best_q = float(_weight(content[i])), -1
+        for q in range(k - 1, -1, -1):
+            r0, i0 = pairs[q]
+            if r - r0 - 1 > _MAX_GAP:
+                break
+            if r0 < r and i0 < i and (sent[r0] == sent[r] or (sent[r0] + 1 == sent[r] and back[sent[r]])):
+                v = value[q] + _weight(content[i]) - _GAP_COST * (pre[r] - pre[r0 + 1])
+                if v > best_v:
+                    best_v, best_q = v, q
+        value.append(best_v)
+        prev.append(best_q)
+
+    k = max(range(len(pairs)), key=value.__getitem__)
+    out: List[Tuple[int, int]] = []
+    while k != -1:
+        out.append(pairs[k])
+        k = prev[k]
+    out.reverse()
+    return out
+
+
+def align_span(sentence: str, chunk_text: str, *, index: Optional[ChunkSpanIndex] = None) -> Optional[Tuple[int, int, float]]:
     """
     Returns (local_start, local_end, score) within chunk_text.
     Score ~[0,1]. Higher = better match.
+
+    Aligns the sentence's content words (stopwords excluded) to the chunk as
+    one in-order chain (_chain) and scores it on word weights (length + 1):
+
+      coverage = (matched - _DISPLACED_COST * displaced) / sentence
+      score    = coverage^2 * sqrt(matched / passage)
+
+    where displaced are sentence words the chunk has outside the chain, and
+    passage covers the chunk's content words from the first match to the
+    last. Sentence words missing from the passage, words out of order and
+    padding in the passage all lower the score; a recombination of two facts
+    of the chunk scores low. Verbatim sentences score 1.0. The returned span
+    is the passage padded with context.
+    Pass a prebuilt `index` to skip re-tokenizing the chunk.
     """
     s = (sentence or "").strip()
-    c = (chunk_text or "")
-    if not s or not c:
+    if not s or not chunk_text:
         return None
+    index = index or ChunkSpanIndex(chunk_text)
+    n_chars = index.text_len
+
+    content = [t for t in _WORD_RE.findall(s.lower()) if t not in _STOPWORDS]
+    chain = _chain(content, index)
+    if not chain:  # nothing to match (or only function words): no support
+        end = min(n_chars, max(80, int(len(s) * 1.4)))
+        return (0, end, 0.0)
+
+    matched = sum(_weight(content[i]) for _, i in chain)
+    total = sum(_weight(t) for t in content)
+    in_chain = {i for _, i in chain}
+    displaced = sum(_weight(t) for i, t in enumerate(content) if i not in in_chain and t in index.positions)
+    first, last = chain[0][0], chain[-1][0]
+    passage = index.content_pre[last + 1] - index.content_pre[first]
+
+    coverage = max(0.0, (matched - _DISPLACED_COST * displaced) / total)
+    score = coverage * coverage * math.sqrt(matched / passage)
 
-    s_low = s.lower()
-    c_low = c.lower()
-
-    # 1) Keyword hit region
-    keys = _keywords(s)
-    hits = []
-    for k in keys:
-        idx = c_low.find(k)
-        if idx != -1:
-            hits.append((idx, idx + len(k)))
-
-    if len(hits) >= 2:
-        start = min(a for a, _ in hits)
-        end = max(b for _, b in hits)
-        # Expand slightly to include context
-        start = max(0, start - 40)
-        end = min(len(c), end + 40)
-        # Score using fuzzy ratio on that window
-        win = c[start:end]
-        score = SequenceMatcher(None, s_low, win.lower()).ratio()
-        return (start, end, score)
-
-    # 2) If sentence (or a big fragment) is literally inside chunk
-    if len(s_low) >= 20:
-        j = c_low.find(s_low[: min(len(s_low), 80)])
-        if j != -1:
-            start = max(0, j - 20)
-            end = min(len(c), j + min(len(s_low), 140))
-            win = c[start:end]
-            score = SequenceMatcher(None, s_low, win.lower()).ratio()
-            return (start, end, score)
-
-    # 3) Fuzzy sliding window fallback (bounded cost)
-    # Take a window ~ 1.4x sentence length, scan a few positions
-    target_len = max(80, int(len(s) * 1.4))
-    if target_len >= len(c):
-        score = SequenceMatcher(None, s_low, c_low).ratio()
-        return (0, len(c), score)
-
-    best = (0, target_len, 0.0)
-    step = max(40, target_len // 6)
-    for start in range(0, len(c) - target_len, step):
-        end = start + target_len
-        win = c_low[start:end]
-        sc = SequenceMatcher(None, s_low, win).ratio()
-        if sc > best[2]:
-            best = (start, end, sc)
-
-    return best
\ No newline at end of file
+    m_start, m_end = index.starts[index.content_pos[first]], index.ends[index.content_pos[last]]
+    return (max(0, m_start - _CONTEXT), min(n_chars, m_end + _CONTEXT), score)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class SpanRecorder:
+    """
+    Collects the timed spans of one request. Spans nest by context: a span
+    opened inside another (on the event loop, in a task, or on the CPU pool
+    via run_cpu, which carries contextvars along) becomes its child.
+    Times are microseconds relative to the recorder's start.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.t0_ns = time.perf_counter_ns()
+        self.wall_start = time.time()
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()  # spans also close on CPU pool threads
+
+    def _open(self, name: str, parent: Optional[int], attrs: Dict[str, Any]) -> Dict[str, Any]:
+        rec = {"id": 0, "parent": parent, "name": name, "start_us": (time.perf_counter_ns() - self.t0_ns) // 1000, "dur_us": None}
+        if attrs:
+            rec["attrs"] = attrs
+        with self._lock:
+            rec["id"] = len(self._spans)
+            self._spans.append(rec)
+        return rec
+
+    def export(self) -> List[Dict[str, Any]]:
+        """Spans in start order; a span still open has dur_us None."""
+        with self._lock:
+            return [dict(s) for s in sorted(self._spans, key=lambda s: (s["start_us"], s["id"]))]
+
+    def elapsed_us(self) -> int:
+        return (time.perf_counter_ns() - self.t0_ns) // 1000
+
+
+_RECORDER: contextvars.ContextVar[Optional[SpanRecorder]] = contextvars.ContextVar("trustcite_spans", default=None)
+_PARENT: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("trustcite_span_parent", default=None)
+
+
+def start_recording(name: str) -> SpanRecorder:
+    """Record spans for the rest of the current context (one request handler / stream)."""
+    rec = SpanRecorder(name)
+    _RECORDER.set(rec)
+    _PARENT.set(None)
+    return rec
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """
+    Timed span under the current one. A no-op (one contextvar read) unless
+    the current request is recording.
+    """
+    rec = _RECORDER.get()
+    if rec is None:
+        yield
+        return
+    s = rec._open(name, _PARENT.get(), attrs)
+    token = _PARENT.set(s["id"])
+    try:
+        yield
+    finally:
+        s["dur_us"] = (time.perf_counter_ns() - rec.t0_ns) // 1000 - s["start_us"]
+        try:
+            _PARENT.reset(token)
+        except ValueError:
+            _PARENT.set(s["parent"])  # exited in another context (async generator resumed elsewhere)
+
+
+class JsonlSpanSink:
+    """
+    Appends one JSON line per recorded request to a local file. write() only
+    snapshots the spans and queues them; a background thread serializes and
+    appends, so request handlers never touch the file. Best-effort: a full
+    queue drops the record, a failed write is counted. close() flushes.
+    """
+    _CLOSE = object()
+
+    def __init__(self, path: str, *, max_pending: int = 10_000):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.errors = 0
+
+    def write(self, rec: SpanRecorder, **fields: Any) -> None:
+        record = {
+            "name": rec.name,
+            "ts": rec.wall_start,
+            "total_us": rec.elapsed_us(),
+            **fields,
+            "spans": rec.export(),
+        }
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trustcite-trace-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:  # append everything already queued with one open()
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = any(r is self._CLOSE for r in batch)
+            lines = [json.dumps(r) + "\n" for r in batch if r is not self._CLOSE]
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.writelines(lines)
+                except OSError:
+                    self.errors += len(lines)
+            if closing:
+                return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out what is queued and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(self._CLOSE)
+        self._thread.join(timeout)
+        self._thread = None
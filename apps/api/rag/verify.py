@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 from .chunking import Chunk
-from .span_align import align_span
+from .span_align import ChunkSpanIndex, align_span
+from .tracing import span
+
+Alignment = Optional[Tuple[int, int, float]]
+
+_VERIFY_POOL: Optional[ProcessPoolExecutor] = None
+_VERIFY_WORKERS = 0
 
 @dataclass(frozen=True)
 class VerifiedCitation:
@@ -19,29 +30,59 @@ class VerifiedSentence:
     citations: List[VerifiedCitation]
     best_score: float
 
-def verify_sentence(
+def verify_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Reusable process pool for (sentence, chunk) alignment jobs, sized by
+    TRUSTCITE_VERIFY_WORKERS (0 = off, verify inline). Alignment is pure
+    Python, so threads would serialize on the GIL; processes do not.
+    Workers are spawned (not forked) so they never inherit torch / thread state.
+    """
+    global _VERIFY_POOL, _VERIFY_WORKERS
+    if _VERIFY_POOL is None:
+        workers = int(os.getenv("TRUSTCITE_VERIFY_WORKERS", "0"))
+        if workers <= 0:
+            return None
+        _VERIFY_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _VERIFY_WORKERS = workers
+    return _VERIFY_POOL
+
+
+def shutdown_verify_executor() -> None:
+    global _VERIFY_POOL
+    if _VERIFY_POOL is not None:
+        _VERIFY_POOL.shutdown(wait=False, cancel_futures=True)
+        _VERIFY_POOL = None
+
+
+@lru_cache(maxsize=256)
+def _worker_index(chunk_text: str) -> ChunkSpanIndex:
+    # per worker process: chunks repeat across questions, index each once
+    return ChunkSpanIndex(chunk_text)
+
+
+def _align_job(job: Tuple[str, str]) -> Alignment:
+    sentence, chunk_text = job
+    return align_span(sentence, chunk_text, index=_worker_index(chunk_text))
+
+
+def _collect(
     sentence: str,
     cited_chunk_ids: List[str],
+    alignments: List[Alignment],
     *,
     chunks_by_id: Dict[str, Chunk],
-    min_score: float = 0.40,
+    min_score: float,
 ) -> VerifiedSentence | None:
-    """
-    Returns VerifiedSentence with tight spans if supported,
-    else None (drop sentence).
-    """
+    """alignments[i] belongs to the i-th cited id that exists in chunks_by_id."""
     verified: List[VerifiedCitation] = []
     best = 0.0
 
-    for cid in cited_chunk_ids:
-        ch = chunks_by_id.get(cid)
-        if not ch:
-            continue
-
-        res = align_span(sentence, ch.text)
+    present = [cid for cid in cited_chunk_ids if cid in chunks_by_id]
+    for cid, res in zip(present, alignments):
         if not res:
             continue
 
+        ch = chunks_by_id[cid]
         local_s, local_e, sc = res
         if sc > best:
             best = sc
@@ -61,25 +102,101 @@ def verify_sentence(
 
     return VerifiedSentence(sentence=sentence, citations=verified, best_score=best)
 
+def verify_sentence(
+    sentence: str,
+    cited_chunk_ids: List[str],
+    *,
+    chunks_by_id: Dict[str, Chunk],
+    min_score: float = 0.40,
+    span_indexes: Optional[Dict[str, ChunkSpanIndex]] = None,
+) -> VerifiedSentence | None:
+    """
+    Returns VerifiedSentence with tight spans if supported,
+    else None (drop sentence).
+    span_indexes: prebuilt per-chunk indexes (from the DocIndexCache entry).
+    """
+    alignments = [
+        align_span(sentence, chunks_by_id[cid].text, index=span_indexes.get(cid) if span_indexes else None)
+        for cid in cited_chunk_ids
+        if cid in chunks_by_id
+    ]
+    return _collect(sentence, cited_chunk_ids, alignments, chunks_by_id=chunks_by_id, min_score=min_score)
+
 def verify_all(
     enforced: List[Tuple[str, List[Tuple[str, int, int]]]],
     *,
     chunks_by_id: Dict[str, Chunk],
     min_score: float = 0.40,
+    span_indexes: Optional[Dict[str, ChunkSpanIndex]] = None,
+    min_parallel_jobs: Optional[int] = None,
 ) -> Tuple[List[VerifiedSentence], int]:
     """
     Input: Day-3 enforced format: [(sentence_text, [(chunk_id,start,end), ...]), ...]
     Output: verified sentences with tight spans + count dropped
+
+    With a verify_executor() and at least min_parallel_jobs (sentence, chunk)
+    pairs (default TRUSTCITE_VERIFY_MIN_JOBS), the alignments are spread over
+    the process pool; smaller inputs run inline, where IPC would cost more
+    than it saves. Results are identical either way.
     """
+    cited = [[cid for (cid, _, _) in cits] for _, cits in enforced]
+    jobs = [
+        (sent_text, chunks_by_id[cid].text)
+        for (sent_text, _), ids in zip(enforced, cited)
+        for cid in ids
+        if cid in chunks_by_id
+    ]
+
+    pool = verify_executor()
+    if min_parallel_jobs is None:
+        min_parallel_jobs = int(os.getenv("TRUSTCITE_VERIFY_MIN_JOBS", "12"))
+    if pool is None or len(jobs) < max(1, min_parallel_jobs):
+        with span("verify.align", mode="inline", jobs=len(jobs)):
+            return _verify_inline(enforced, cited, chunks_by_id=chunks_by_id, min_score=min_score, span_indexes=span_indexes)
+
+    chunksize = max(1, -(-len(jobs) // _VERIFY_WORKERS))
+    try:
+        with span("verify.align", mode="pool", jobs=len(jobs)):
+            results = iter(list(pool.map(_align_job, jobs, chunksize=chunksize)))
+    except BrokenProcessPool:
+        shutdown_verify_executor()  # a worker died; next call starts a fresh pool
+        with span("verify.align", mode="inline", jobs=len(jobs)):
+            return _verify_inline(enforced, cited, chunks_by_id=chunks_by_id, min_score=min_score, span_indexes=span_indexes)
+
+    out: List[VerifiedSentence] = []
+    dropped = 0
+    for (sent_text, _), ids in zip(enforced, cited):
+        alignments = [next(results) for cid in ids if cid in chunks_by_id]
+        vs = _collect(sent_text, ids, alignments, chunks_by_id=chunks_by_id, min_score=min_score)
+        if vs is None:
+            dropped += 1
+            continue
+        out.append(vs)
+
+    return out, dropped
+
+def _verify_inline(
+    enforced: List[Tuple[str, List[Tuple[str, int, int]]]],
+    cited: List[List[str]],
+    *,
+    chunks_by_id: Dict[str, Chunk],
+    min_score: float,
+    span_indexes: Optional[Dict[str, ChunkSpanIndex]],
+) -> Tuple[List[VerifiedSentence], int]:
     out: List[VerifiedSentence] = []
     dropped = 0
 
-    for sent_text, cits in enforced:
-        cited_ids = [cid for (cid, _, _) in cits]
-        vs = verify_sentence(sent_text, cited_ids, chunks_by_id=chunks_by_id, min_score=min_score)
+    for (sent_text, _), cited_ids in zip(enforced, cited):
+        vs = verify_sentence(
+            sent_text,
+            cited_ids,
+            chunks_by_id=chunks_by_id,
+            min_score=min_score,
+            span_indexes=span_indexes,
+        )
         if vs is None:
             dropped += 1
             continue
         out.append(vs)
 
-    return out, dropped
\ No newline at end of file
+    return out, dropped
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from rag.admission import Overloaded, StageLimiter
+
+
+def test_queues_then_admits_in_turn():
+    lim = StageLimiter("gen", 1, max_queue=4, max_wait_s=1.0)
+    order = []
+
+    async def job(i):
+        async with lim.slot() as adm:
+            order.append((i, adm.depth))
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(job(i) for i in range(3)))
+
+    asyncio.run(run())
+    assert [i for i, _ in order] == [0, 1, 2]
+    assert [d for _, d in order] == [0, 0, 1]  # queued ahead of it on arrival
+    st = lim.stats()
+    assert st["admitted"] == 3 and st["active"] == 0 and st["queued"] == 0
+
+
+def test_full_queue_429_and_wait_timeout_503():
+    lim = StageLimiter("embed", 1, max_queue=1, max_wait_s=0.05)
+
+    async def run():
+        async with lim.slot():
+            waiter = asyncio.ensure_future(lim.acquire())
+            await asyncio.sleep(0)  # waiter is now queued
+            with pytest.raises(Overloaded) as full:
+                await lim.acquire()
+            with pytest.raises(Overloaded) as timed_out:
+                await waiter
+        return full.value, timed_out.value
+
+    full, timed_out = asyncio.run(run())
+    assert full.status == 429 and full.retry_after_s >= 1
+    assert timed_out.status == 503
+    st = lim.stats()
+    assert st["rejected_full"] == 1 and st["rejected_timeout"] == 1 and st["active"] == 0
@@ -0,0 +1,42 @@
+import numpy as np
+
+from rag.ann import IVFIndex
+
+
+def _unit(x):
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_index_matches_brute_force_on_clustered_data():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((40, 32))
+    vecs = _unit(centers[rng.integers(0, 40, 5000)] + 0.1 * rng.standard_normal((5000, 32)))
+
+    idx = IVFIndex(32, n_probe=8, min_train_size=1000)
+    for i in range(0, len(vecs), 250):  # incremental ingest trains once past min_train_size
+        idx.add(vecs[i:i + 250])
+    assert idx.trained and len(idx) == 5000
+
+    hits = 0
+    for q in _unit(vecs[:50] + 0.05 * rng.standard_normal((50, 32))):
+        ids, scores = idx.search(q, 5)
+        assert np.all(np.diff(scores) <= 0)
+        hits += len(set(ids.tolist()) & set(np.argsort(-(vecs @ q))[:5].tolist()))
+    assert hits / 250 >= 0.9
+
+
+def test_ivf_incremental_add_keeps_lists_consistent():
+    rng = np.random.default_rng(1)
+    idx = IVFIndex(16, n_probe=4, min_train_size=200)
+    idx.add(_unit(rng.standard_normal((300, 16))))
+    trained_lists = len(idx.centroids)
+    for _ in range(20):  # small ingests stay below the 4x re-train point
+        idx.add(_unit(rng.standard_normal((int(rng.integers(1, 30)), 16))))
+    assert len(idx.centroids) == trained_lists and len(idx) < 4 * 300
+
+    rows = np.concatenate([idx._list(i) for i in range(trained_lists)])
+    assert sorted(rows.tolist()) == list(range(len(idx)))  # every row in exactly one list
+    for i in range(trained_lists):
+        assert np.all(idx.assign[idx._list(i)] == i)
+        assert np.all(np.diff(idx._list(i)) > 0)  # appended in row order
+    np.testing.assert_array_equal(idx.assign, np.argmax(idx.vectors @ idx.centroids.T, axis=1))
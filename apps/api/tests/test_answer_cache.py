@@ -0,0 +1,61 @@
+import numpy as np
+
+from rag.answer_cache import SemanticAnswerCache
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_hit_needs_similar_question_and_same_evidence():
+    cache = SemanticAnswerCache(threshold=0.9, max_per_doc=4)
+    q = _unit([1.0, 0.0, 0.0])
+    cache.put("doc", q, ["c0002", "c0001"], "answer")
+
+    near = _unit([1.0, 0.2, 0.0])  # cosine ~0.98
+    assert cache.get("doc", near, ["c0001", "c0002"]) == "answer"  # order-insensitive evidence
+    assert cache.get("doc", near, ["c0001", "c0003"]) is None      # different evidence
+    assert cache.get("other-doc", near, ["c0001", "c0002"]) is None
+    assert cache.get("doc", _unit([0.0, 1.0, 0.0]), ["c0001", "c0002"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_ring_buffer_and_doc_lru_bound_memory():
+    cache = SemanticAnswerCache(threshold=0.99, max_docs=2, max_per_doc=2)
+    vecs = [_unit(np.eye(3)[i]) for i in range(3)]
+    for i, v in enumerate(vecs):
+        cache.put("a", v, ["c0000"], i)
+    assert cache.get("a", vecs[0], ["c0000"]) is None  # overwritten by the third question
+    assert cache.get("a", vecs[2], ["c0000"]) == 2
+
+    cache.put("b", vecs[0], ["c0000"], "b")
+    cache.put("c", vecs[0], ["c0000"], "c")
+    assert cache.stats()["documents"] == 2
+
+
+def test_answer_cache_is_opt_in_so_a_negated_question_is_not_served(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from rag.generation import OllamaConfig
+
+    class CountingLLM:
+        cfg = OllamaConfig(base_url="http://unused", model="fake")
+        calls = 0
+
+        async def generate(self, prompt, *, num_ctx=None):
+            self.calls += 1
+            return "Vancouver is a coastal city in British Columbia [c0000]"
+
+    assert main.ANSWER_CACHE is None  # TRUSTCITE_ANSWER_CACHE_DOCS defaults to 0
+    llm = CountingLLM()
+    monkeypatch.setattr(main, "OLLAMA", llm)
+    monkeypatch.setattr(main, "GEN_CACHE", None)
+    client = TestClient(main.app)
+    doc = "Vancouver is a coastal city in British Columbia. It is known for its film industry."
+    for q in ("Is Vancouver a coastal city in British Columbia?", "Is Vancouver not a coastal city in British Columbia?"):
+        r = client.post("/ask", json={"question": q, "document_text": doc})
+        assert r.status_code == 200 and not r.json()["abstained"]
+        assert "answer" not in r.json()["trace"]["cache_hits"]
+    assert llm.calls == 2  # same evidence, near-identical embedding: still generated afresh
@@ -0,0 +1,47 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from rag.generation import OllamaConfig
+
+DOC = "Vancouver is a coastal city in British Columbia. It is known for its film industry."
+
+
+class FakeLLM:
+    cfg = OllamaConfig(base_url="http://unused", model="fake")
+
+    def __init__(self, pieces, fail_after=None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+
+    async def stream(self, prompt, *, num_ctx=None):
+        for i, p in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise RuntimeError("backend went away")
+            yield p
+
+
+def _events(monkeypatch, llm, question="Is Vancouver a coastal city in British Columbia?"):
+    monkeypatch.setattr(main, "OLLAMA", llm)
+    monkeypatch.setattr(main, "GEN_CACHE", None)
+    r = TestClient(main.app).post("/ask/stream", json={"question": question, "document_text": DOC})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in r.text.splitlines() if line]
+
+
+def test_stream_emits_verified_sentences_then_done(monkeypatch):
+    events = _events(monkeypatch, FakeLLM(["Vancouver is a coastal city ", "in British Columbia [c0000]"]))
+    assert [e["type"] for e in events] == ["sentence", "done"]
+    sent = events[0]
+    assert sent["citations"][0]["chunk_id"] == "c0000"
+    assert "doc_id" not in sent["citations"][0]
+    assert events[-1]["abstained"] is False and events[-1]["trace"]["fallback_used"] is False
+
+
+def test_stream_failure_emits_error_then_fallback(monkeypatch):
+    events = _events(monkeypatch, FakeLLM(["It is known", " for its film"], fail_after=1))
+    types = [e["type"] for e in events]
+    assert types[0] == "error" and "backend went away" in events[0]["detail"]
+    assert types[-1] == "done" and events[-1]["trace"]["fallback_used"] is True
+    assert "sentence" in types  # evidence-only answer
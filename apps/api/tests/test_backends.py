@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rag.backends import OllamaBackendPool
+from rag.generation import OllamaConfig
+
+
+def _stub(status=200, delay=0.0):
+    """Local Ollama stand-in: /api/generate answers with its own port, /api/tags is the health probe."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(self.server.status, {"models": []})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(self.server.delay)
+            self._reply(self.server.status, {"response": str(self.server.server_port), "done": True})
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.status, srv.delay = status, delay
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def servers():
+    started = []
+    def make(**kw):
+        srv = _stub(**kw)
+        started.append(srv)
+        return srv
+    yield make
+    for srv in started:
+        srv.shutdown()
+
+
+def _pool(srvs, **kw):
+    urls = [f"http://127.0.0.1:{s.server_port}" for s in srvs]
+    return OllamaBackendPool(urls, OllamaConfig(base_url=urls[0], model="stub", timeout_s=5), **kw)
+
+
+def test_spreads_concurrent_requests(servers):
+    a, b = servers(delay=0.1), servers(delay=0.1)
+    pool = _pool([a, b], max_inflight=2)
+
+    async def run():
+        out = await asyncio.gather(*(pool.generate("q") for _ in range(4)))
+        await pool.aclose()
+        return out
+
+    ports = asyncio.run(run())
+    assert sorted(ports) == sorted([str(a.server_port)] * 2 + [str(b.server_port)] * 2)
+    assert all(st["inflight"] == 0 and st["healthy"] for st in pool.stats())
+
+
+def test_ejects_failing_backend_and_reprobes(servers):
+    bad, good = servers(status=500), servers()
+    pool = _pool([bad, good], fail_threshold=1, eject_s=0.2)
+
+    async def run():
+        # a 5xx is retried on the other backend, so callers never see it
+        assert {await pool.generate("q") for _ in range(4)} == {str(good.server_port)}
+        assert not pool.stats()[0]["healthy"]
+        assert pool.stats()[0]["requests"] == 1  # ejected after the first failure
+
+        bad.status = 200
+        await asyncio.sleep(0.25)
+        await pool.generate("q")  # probe runs before routing
+        assert pool.stats()[0]["healthy"]
+        await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_all_ejected_still_tries_and_raises(servers):
+    bad = servers(status=503)
+    pool = _pool([bad], fail_threshold=1, eject_s=60)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await pool.generate("q")
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert pool.stats()[0]["requests"] == 2
+
+
+def test_client_rebuilt_on_another_loop_closes_the_old_pool():
+    from rag.generation import AsyncOllamaClient
+
+    client = AsyncOllamaClient(OllamaConfig(base_url="http://127.0.0.1:9", model="m"))
+
+    async def pool():
+        return client._http()
+
+    other = asyncio.new_event_loop()
+    t = threading.Thread(target=other.run_forever, daemon=True)
+    t.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(pool(), other).result(5)
+        new = asyncio.run(pool())  # a second loop: rebuilt, the old pool closed on its own loop
+        assert new is not old
+        deadline = time.monotonic() + 5
+        while not old.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert old.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        t.join(5)
+        other.close()
+
+    assert asyncio.run(pool()) is not new  # that loop is gone: dropped, not awaited
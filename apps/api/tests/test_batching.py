@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from rag.batching import BatchingEmbedder
+
+
+class QueryEmbedder:
+    model_name = "test/queries"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.single = 0
+
+    def embed_queries(self, texts):
+        if self.fail:
+            raise RuntimeError("model down")
+        self.batches.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    def embed_query(self, text):
+        self.single += 1
+        return np.array([float(len(text)), 1.0], dtype=np.float32)
+
+
+def test_concurrent_queries_coalesce_and_get_their_own_row():
+    inner = QueryEmbedder()
+    emb = BatchingEmbedder(inner, max_batch=8, max_wait_ms=50)
+    texts = ["a" * n for n in range(1, 9)]
+    start = threading.Barrier(len(texts))
+
+    def one(t):
+        start.wait()
+        return emb.embed_query(t)
+
+    with ThreadPoolExecutor(len(texts)) as pool:
+        vecs = list(pool.map(one, texts))
+    emb.close()
+
+    assert [v[0] for v in vecs] == [len(t) for t in texts]
+    assert len(inner.batches) < len(texts)
+    assert emb.stats()["queries"] == len(texts)
+
+
+def test_encoder_error_reaches_every_caller():
+    emb = BatchingEmbedder(QueryEmbedder(fail=True), max_wait_ms=20)
+    with ThreadPoolExecutor(3) as pool:
+        futs = [pool.submit(emb.embed_query, "q") for _ in range(3)]
+        for f in futs:
+            with pytest.raises(RuntimeError, match="model down"):
+                f.result(timeout=5)
+    emb.close()
+
+
+def test_queries_racing_close_all_resolve():
+    inner = QueryEmbedder()
+    emb = BatchingEmbedder(inner, max_wait_ms=1)
+    with ThreadPoolExecutor(8) as pool:
+        futs = [pool.submit(emb.embed_query, f"q{i}") for i in range(200)]
+        emb.close()
+        vecs = [f.result(timeout=5) for f in futs]  # none stranded behind the sentinel
+    assert len(vecs) == 200
+    emb.close()  # idempotent
+    assert emb.embed_query("after")[0] == 5 and inner.single >= 1
@@ -0,0 +1,17 @@
+from bench.bench_chunking import legacy_chunk_document, make_document
+from rag.chunking import chunk_document
+
+
+def test_chunker_matches_legacy_offsets():
+    docs = [
+        "",
+        "\n\n\r\n",
+        "one para",
+        "a\n\nb\r\n\r\nc\n\r\n\n\nd\n \n\ne",
+        make_document(20_000, seed=7),
+        make_document(20_000, seed=8, long_paragraphs=True),
+        make_document(20_000, seed=9, crlf=True),
+    ]
+    for doc in docs:
+        for max_chars in (40, 900):
+            assert chunk_document(doc, max_chars=max_chars) == legacy_chunk_document(doc, max_chars=max_chars)
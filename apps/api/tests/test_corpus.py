@@ -0,0 +1,128 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from rag.corpus import Corpus
+from rag.generation import OllamaConfig
+
+
+class WordEmbedder:
+    """Bag-of-words vectors: texts sharing words are close, deterministic across processes."""
+    model_name = "test/words"
+
+    def __init__(self):
+        self.texts = 0
+
+    def _vec(self, text):
+        v = np.zeros(64, dtype=np.float32)
+        for w in re.findall(r"[a-z0-9]+", text.lower()):
+            v[zlib.crc32(w.encode()) % 64] += 1.0
+        return v / max(np.linalg.norm(v), 1e-9)
+
+    def embed_texts(self, texts):
+        self.texts += len(texts)
+        return np.stack([self._vec(t) for t in texts])
+
+    def embed_query(self, text):
+        return self._vec(text)
+
+
+def _doc(name: str, paras: int) -> str:
+    # ~300-char paragraphs, each with a word of its own; chunks pack a few paragraphs
+    return "\n\n".join(f"{name} section {p}. " + f"{name}x{p} clause wording. " * 10 for p in range(paras))
+
+
+def test_corpus_ingest_maps_rows_to_documents():
+    emb = WordEmbedder()
+    corpus = Corpus(min_train_size=8)
+    docs = {f"doc{i}": _doc(f"topic{i}", paras=4 + 3 * i) for i in range(4)}
+    n_chunks = {d: corpus.ingest(text, emb, doc_id=d)[1] for d, text in docs.items()}
+    assert corpus.stats()["documents"] == 4
+    assert corpus.stats()["chunks"] == sum(n_chunks.values())
+    assert corpus.stats()["ann_lists"] > 0  # past min_train_size: searches go through the IVF lists
+
+    for doc_id, text in docs.items():
+        probe = text.split("\n\n")[-1]  # last paragraph: in the document's last chunk
+        hit = corpus.search(emb.embed_query(probe), k=1)[0]
+        assert hit.doc_id == doc_id
+        assert hit.chunk.text == text[hit.chunk.start:hit.chunk.end]  # offsets into that document
+        assert hit.chunk.chunk_id == f"c{n_chunks[doc_id] - 1:04d}"
+
+    # same text again is a no-op; same id with other text is rejected
+    assert corpus.ingest(docs["doc1"], emb, doc_id="doc1") == ("doc1", n_chunks["doc1"])
+    with pytest.raises(ValueError):
+        corpus.ingest("something else", emb, doc_id="doc1")
+    assert corpus.stats()["chunks"] == sum(n_chunks.values())
+
+
+def test_corpus_ingest_race_on_one_doc_id_rejects_the_other_text():
+    corpus = Corpus()
+
+    class RacingEmbedder(WordEmbedder):
+        # another ingest of the same doc_id completes while this one is embedding
+        def embed_texts(self, texts):
+            if not corpus.stats()["documents"]:
+                corpus.ingest("alpha text", WordEmbedder(), doc_id="same")
+            return super().embed_texts(texts)
+
+    with pytest.raises(ValueError):
+        corpus.ingest("beta text", RacingEmbedder(), doc_id="same")
+    assert corpus.ingest("alpha text", WordEmbedder(), doc_id="same") == ("same", 1)
+    assert corpus.stats()["documents"] == 1
+
+
+def test_corpus_persists_and_reloads(tmp_path):
+    emb = WordEmbedder()
+    corpus = Corpus(str(tmp_path), min_train_size=8)
+    docs = {f"doc{i}": _doc(f"topic{i}", paras=9) for i in range(3)}
+    for d, text in docs.items():
+        corpus.ingest(text, emb, doc_id=d)
+    q = emb.embed_query(docs["doc2"].split("\n\n")[1])
+    before = [(h.doc_id, h.chunk) for h in corpus.search(q, k=3)]
+
+    emb2 = WordEmbedder()
+    reloaded = Corpus(str(tmp_path), min_train_size=8)
+    assert reloaded.load(emb2) == 3
+    assert emb2.texts == 0  # vectors come from the store, nothing re-embedded
+    assert reloaded.stats() == corpus.stats()
+    assert [(h.doc_id, h.chunk) for h in reloaded.search(q, k=3)] == before
+
+
+class CitingLLM:
+    cfg = OllamaConfig(base_url="http://unused", model="fake")
+
+    def __init__(self, text):
+        self.text = text
+
+    async def generate(self, prompt, *, num_ctx=None):
+        return self.text
+
+
+def test_corpus_ask_maps_local_ids_back(monkeypatch):
+    alpha = "Vancouver is a coastal city in British Columbia."
+    beta = "Ottawa is the capital city of Canada."
+    monkeypatch.setattr(main, "CORPUS", Corpus())
+    monkeypatch.setattr(main, "GEN_CACHE", None)
+    monkeypatch.setattr(main, "ANSWER_CACHE", None)
+    # prompt labels follow (doc_id, chunk_id) order: alpha/c0000 -> c0000, beta/c0000 -> c0001
+    monkeypatch.setattr(main, "OLLAMA", CitingLLM(
+        "Vancouver is a coastal city in British Columbia [c0000]\nOttawa is the capital city of Canada [c0001]"
+    ))
+    client = TestClient(main.app)
+    for doc_id, text in (("beta", beta), ("alpha", alpha)):
+        r = client.post("/corpus/documents", json={"document_text": text, "doc_id": doc_id})
+        assert r.status_code == 200 and r.json() == {"doc_id": doc_id, "chunks": 1}
+
+    r = client.post("/corpus/ask", json={"question": "Vancouver coastal city British Columbia Ottawa capital city Canada", "top_k": 2})
+    assert r.status_code == 200
+    data = r.json()
+    assert {(c["doc_id"], c["chunk_id"]) for c in data["trace"]["retrieved"]} == {("alpha", "c0000"), ("beta", "c0000")}
+    assert not data["abstained"]
+    cited = {(c["doc_id"], c["chunk_id"]) for s in data["answer"] for c in s["citations"]}
+    assert cited == {("alpha", "c0000"), ("beta", "c0000")}
+    by_text = {s["sentence"].split(" is ")[0]: s["citations"][0]["doc_id"] for s in data["answer"]}
+    assert by_text == {"Vancouver": "alpha", "Ottawa": "beta"}
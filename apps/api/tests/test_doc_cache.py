@@ -0,0 +1,180 @@
+import threading
+import time
+
+import numpy as np
+
+from rag.retrieval import DocIndexCache
+
+
+class CountingEmbedder:
+    model_name = "test/counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def _doc(i: int, paras: int = 1) -> str:
+    return "\n\n".join(f"Document {i} paragraph {p} has some text." for p in range(paras))
+
+
+def test_doc_cache_lru_keeps_recently_used():
+    emb = CountingEmbedder()
+    cache = DocIndexCache(max_items=2)
+
+    cache.get_or_build(_doc(1), emb)
+    cache.get_or_build(_doc(2), emb)
+    cache.get_or_build(_doc(1), emb)  # touch 1 -> 2 becomes LRU
+    cache.get_or_build(_doc(3), emb)  # evicts 2
+    cache.get_or_build(_doc(1), emb)
+    assert emb.calls == 3
+
+    st = cache.stats()
+    assert st["hits"] == 2 and st["misses"] == 3 and st["evictions"] == 1
+
+
+def test_doc_cache_byte_budget_and_ttl():
+    emb = CountingEmbedder()
+    cache = DocIndexCache(max_items=100, max_bytes=1)  # every entry is over budget
+    cache.get_or_build(_doc(1), emb)
+    cache.get_or_build(_doc(2), emb)
+    assert cache.stats()["items"] == 1  # newest is always kept
+
+    cache = DocIndexCache(max_items=8, ttl_s=-1.0)  # everything is already expired
+    cache.get_or_build(_doc(1), emb)
+    cache.get_or_build(_doc(1), emb)
+    assert cache.stats()["expirations"] == 1
+
+
+def test_doc_cache_single_flight_concurrent_misses():
+    class SlowEmbedder(CountingEmbedder):
+        def embed_texts(self, texts):
+            time.sleep(0.05)
+            return super().embed_texts(texts)
+
+    emb = SlowEmbedder()
+    cache = DocIndexCache(max_items=8)
+    threads = [threading.Thread(target=cache.get_or_build, args=(_doc(1, paras=3), emb)) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert emb.calls == 1
+    assert cache.stats()["builds"] == 1
+
+
+def test_doc_cache_incremental_reuses_unchanged_chunks():
+    class TextCountingEmbedder(CountingEmbedder):
+        def __init__(self):
+            super().__init__()
+            self.texts = 0
+
+        def embed_texts(self, texts):
+            self.texts += len(texts)
+            return np.stack([np.full(4, float(len(t)), dtype=np.float32) for t in texts])
+
+    paras = [f"Section {i}. " + "Standard clause text. " * 30 for i in range(10)]
+    v1 = "\n\n".join(paras)
+    v2 = "\n\n".join(paras[:3] + ["Section 3. Edited clause text."] + paras[4:] + ["Appendix."])
+
+    emb = TextCountingEmbedder()
+    cache = DocIndexCache(max_items=8)
+    chunks1, _ = cache.get_or_build(v1, emb)
+    before = emb.texts
+    chunks2, mat2 = cache.get_or_build(v2, emb)
+
+    assert emb.texts - before < len(chunks2)  # only changed/new chunks were embedded
+    for c, row in zip(chunks2, mat2):
+        assert v2[c.start:c.end] == c.text
+        assert row[0] == float(len(c.text))  # reused rows line up with the new chunks
+    assert cache.stats()["rows_reused"] > 0
+
+
+class HashEmbedder(CountingEmbedder):
+    """Deterministic per-text vectors that do not survive int8 quantization exactly."""
+    def __init__(self):
+        super().__init__()
+        self.texts = 0
+        self.queries = 0
+
+    def _vec(self, text):
+        v = np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(16).astype(np.float32)
+        return v / np.linalg.norm(v)
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return np.stack([self._vec(t) for t in texts])
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self._vec(text)
+
+
+def test_quantized_without_exact_tier_does_not_reembed_on_query():
+    from rag.retrieval import retrieve_top_k
+
+    emb = HashEmbedder()
+    cache = DocIndexCache(max_items=8, storage="int8", hybrid=False)
+    doc = "\n\n".join(f"Section {i}. " + "Standard clause text. " * 30 for i in range(40))
+    for q in ("Section 3", "Section 17", "Section 29"):
+        hits = retrieve_top_k(question=q, document_text=doc, embedder=emb, cache=cache, k=5, fusion=None)
+        assert len(hits) == 5
+    assert emb.calls == 1  # the build only; no re-rank embeds
+    assert emb.queries == 3
+
+
+def test_quantized_reuse_never_writes_dequantized_rows(tmp_path):
+    from rag.index_store import DiskIndexStore
+
+    paras = [f"Section {i}. " + "Standard clause text. " * 30 for i in range(10)]
+    v1 = "\n\n".join(paras)
+    v2 = "\n\n".join(paras[:3] + ["Section 3. Edited clause text."] + paras[4:])
+
+    # no exact tier: nothing is reused, every row is embedded afresh
+    emb = HashEmbedder()
+    cache = DocIndexCache(max_items=8, storage="int8", hybrid=False)
+    chunks1, _ = cache.get_or_build(v1, emb)
+    chunks2, _ = cache.get_or_build(v2, emb)
+    assert cache.stats()["rows_reused"] == 0
+    assert emb.texts == len(chunks1) + len(chunks2)
+
+    # disk mmap tier: reused rows are the exact float32 ones
+    store = DiskIndexStore(str(tmp_path))
+    emb = HashEmbedder()
+    cache = DocIndexCache(max_items=8, store=store, storage="int8", hybrid=False)
+    cache.get_or_build(v1, emb)
+    chunks2, _ = cache.get_or_build(v2, emb)
+    assert cache.stats()["rows_reused"] > 0
+    _, saved = store.load(cache._key(v2), v2, model_name=emb.model_name)
+    want = np.stack([emb._vec(c.text) for c in chunks2])
+    np.testing.assert_array_equal(np.asarray(saved), want)
+
+
+def test_disk_store_prunes_least_recently_used_keys(tmp_path):
+    import os
+    import time
+
+    from rag.chunking import Chunk
+    from rag.index_store import DiskIndexStore
+
+    store = DiskIndexStore(str(tmp_path), max_items=4)
+    chunks = [Chunk("c0000", 0, 4, "text")]
+    mat = np.ones((1, 3), dtype=np.float32)
+    past = time.time() - 100
+    for i in range(4):
+        store.save(f"k{i}", chunks, mat, model_name="m", n_chars=4)
+        for name in os.listdir(tmp_path / "m"):
+            if name.startswith(f"k{i}."):
+                os.utime(tmp_path / "m" / name, (past + i, past + i))
+    assert store.load("k0", "text", model_name="m") is not None  # used: now the most recent
+
+    store.save_text("k4", "text")  # fifth key: pruned back to 90% of 4
+    assert store.stats() == {"items": 3, "max_items": 4, "pruned": 2}
+    assert [store.load(f"k{i}", "text", model_name="m") is not None for i in range(4)] == [True, False, False, True]
+    assert sorted(os.listdir(tmp_path / "m")) == sorted(f"k{i}.{ext}" for i in (0, 3) for ext in ("json", "spans.npy", "vec.npy"))
+    assert store.load_text("k4") == "text"
@@ -0,0 +1,69 @@
+import numpy as np
+
+from rag.embed_cache import ChunkEmbeddingCache
+from rag.embeddings import Embedder
+from rag.retrieval import DocIndexCache
+
+
+class FakeModel:
+    """Deterministic 8-d 'embeddings'; records every text it encodes."""
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        out = np.zeros((len(texts), 8), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i, hash(t) % 8] = 1.0
+        return out
+
+
+def _row(v):
+    return np.full(4, v, dtype=np.float32)
+
+
+def test_hit_miss_and_lru_eviction_by_bytes():
+    cache = ChunkEmbeddingCache(max_bytes=2 * _row(0).nbytes)
+    a, b, c = (ChunkEmbeddingCache.key("m", t) for t in "abc")
+
+    assert cache.get_many([a]) == [None]
+    cache.put_many([(a, _row(1)), (b, _row(2))])
+    assert cache.get_many([a])[0][0] == 1  # a is now most recent
+    cache.put_many([(c, _row(3))])  # over budget: evicts b
+
+    got = cache.get_many([a, b, c])
+    assert got[0] is not None and got[1] is None and got[2] is not None
+    st = cache.stats()
+    assert st["items"] == 2 and st["evictions"] == 1
+    assert st["hits"] == 3 and st["misses"] == 2
+
+
+def test_keys_are_per_model_and_rows_are_copies():
+    assert ChunkEmbeddingCache.key("m1", "x") != ChunkEmbeddingCache.key("m2", "x")
+    cache = ChunkEmbeddingCache()
+    mat = np.ones((2, 4), dtype=np.float32)
+    k = ChunkEmbeddingCache.key("m", "x")
+    cache.put_many([(k, mat[0])])
+    mat[0] = 5
+    assert cache.get_many([k])[0][0] == 1
+
+
+def test_reingested_document_only_encodes_changed_chunks():
+    model = FakeModel()
+    emb = Embedder(model_name="fake", _model=model, text_cache=ChunkEmbeddingCache())
+    # incremental=False and max_items=1: the doc cache cannot help, only the chunk cache can
+    docs = DocIndexCache(max_items=1, incremental=False, hybrid=False)
+
+    paras = [f"Paragraph {i} of the master services agreement. " * 8 for i in range(4)]
+    v1 = "\n\n".join(paras)
+    docs.get_entry(v1, emb)
+    first = len(model.encoded)
+
+    docs.get_entry("Some other document entirely.", emb)  # evicts v1
+    model.encoded.clear()
+
+    v2 = "\n\n".join(paras[:3] + ["A rewritten final paragraph. " * 8])
+    entry = docs.get_entry(v2, emb)
+    assert 0 < len(model.encoded) < first
+    assert all("rewritten" in t for t in model.encoded)
+    assert entry.mat.shape[0] == len(entry.chunks)
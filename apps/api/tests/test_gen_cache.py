@@ -0,0 +1,57 @@
+from rag.gen_cache import GenerationCache
+
+
+def test_memory_lru_and_disk_tier(tmp_path):
+    k = [GenerationCache.key("m", {"temperature": 0.1}, f"prompt {i}") for i in range(3)]
+    assert GenerationCache.key("m", {"temperature": 0.2}, "prompt 0") != k[0]
+
+    cache = GenerationCache(2, root=str(tmp_path))
+    for i, key in enumerate(k):
+        cache.put(key, f"answer {i} [c0000]")
+    assert cache.stats()["items"] == 2  # k[0] evicted from memory ...
+    assert cache.get(k[0]) == "answer 0 [c0000]"  # ... but still on disk
+    assert cache.stats()["disk_hits"] == 1
+
+    fresh = GenerationCache(2, root=str(tmp_path))  # restart
+    assert fresh.get(k[2]) == "answer 2 [c0000]"
+    assert fresh.get(GenerationCache.key("m", {}, "never seen")) is None
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = GenerationCache(8, root=str(tmp_path), ttl_s=-1)  # everything is already stale
+    key = GenerationCache.key("m", {}, "p")
+    cache.put(key, "text")
+    assert cache.get(key) is None
+    assert not any(p.suffix == ".json" for p in tmp_path.rglob("*"))
+
+
+def test_disk_write_failure_is_best_effort(tmp_path, monkeypatch):
+    import rag.gen_cache
+
+    def broken(path, write):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(rag.gen_cache, "_atomic_write", broken)
+    cache = GenerationCache(8, root=str(tmp_path))
+    key = GenerationCache.key("m", {}, "p")
+    cache.put(key, "text")  # does not raise
+    assert cache.get(key) == "text"  # memory tier still serves it
+    assert cache.stats()["disk_errors"] == 1
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    import os
+
+    cache = GenerationCache(2, root=str(tmp_path), max_disk_items=10)
+    keys = [GenerationCache.key("m", {}, f"prompt {i}") for i in range(25)]
+    for i, key in enumerate(keys):
+        cache.put(key, f"answer {i}")
+        os.utime(cache._path(key), (i, i))  # distinct mtimes, oldest first
+    on_disk = list(tmp_path.rglob("*.json"))
+    assert len(on_disk) <= 10
+    assert cache.stats()["disk_pruned"] == 25 - len(on_disk)
+
+    fresh = GenerationCache(2, root=str(tmp_path), max_disk_items=10)
+    assert fresh.stats()["disk_items"] == len(on_disk)
+    assert fresh.get(keys[-1]) == "answer 24"  # newest survive
+    assert fresh.get(keys[0]) is None  # oldest went first
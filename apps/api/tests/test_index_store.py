@@ -0,0 +1,24 @@
+import numpy as np
+
+from rag.chunking import chunk_document
+from rag.index_store import DiskIndexStore
+
+
+def test_index_store_roundtrip(tmp_path):
+    doc = "Vancouver is a coastal city.\n\nIt is known for its film industry.\n\nToronto is large."
+    chunks = chunk_document(doc, max_chars=40)
+    mat = np.random.default_rng(0).standard_normal((len(chunks), 8)).astype(np.float32)
+
+    store = DiskIndexStore(str(tmp_path))
+    store.save("k1", chunks, mat, model_name="org/model", n_chars=len(doc))
+
+    loaded = store.load("k1", doc, model_name="org/model")
+    assert loaded is not None
+    chunks2, mat2 = loaded
+    assert chunks2 == chunks
+    assert isinstance(mat2, np.memmap)
+    assert np.array_equal(np.asarray(mat2), mat)
+
+    # different model or different text length -> miss
+    assert store.load("k1", doc, model_name="other/model") is None
+    assert store.load("k1", doc + "!", model_name="org/model") is None
@@ -0,0 +1,27 @@
+import numpy as np
+
+from rag.chunking import Chunk
+from rag.lexical import LexicalIndex, fuse_scores, tokenize
+
+
+def _chunks(texts):
+    return [Chunk(chunk_id=f"c{i:04d}", start=0, end=len(t), text=t) for i, t in enumerate(texts)]
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("See Clause 7.3(b) and ISO-27001.") == ["see", "clause", "7.3", "b", "and", "iso-27001"]
+
+
+def test_bm25_finds_rare_identifier_and_rrf_promotes_it():
+    texts = [f"This clause covers general policy item {i}." for i in range(50)]
+    texts.append("Clause 7.3 requires ISO-27001 certification before renewal.")
+    lex = LexicalIndex(_chunks(texts))
+
+    bm25, coverage = lex.score("What does clause 7.3 say about ISO-27001?")
+    assert int(np.argmax(bm25)) == 50
+    assert coverage[50] == 1.0 and coverage[:50].max() < 0.5
+
+    dense = np.linspace(0.5, 0.35, 51).astype(np.float32)  # the target ranks last on cosine
+    fused = fuse_scores(dense, bm25, method="rrf", coverage=coverage)
+    assert int(np.argmax(fused)) == 50
+    assert int(np.argmax(fuse_scores(dense, bm25, method="weighted"))) == 50
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from rag.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    m = MetricsRegistry(buckets=(0.1, 1.0))
+    m.describe("req_seconds", "Request latency")
+    m.inc("hits_total", cache="gen")
+    m.inc("hits_total", 2, cache="gen")
+    for v in (0.05, 0.5, 5.0):
+        m.observe("req_seconds", v, stage="llm")
+
+    text = m.render([("queue_depth", "gauge", {"stage": "embed"}, 3)])
+    assert 'hits_total{cache="gen"} 3' in text
+    assert "# HELP req_seconds Request latency" in text
+    assert "# TYPE req_seconds histogram" in text
+    assert 'req_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'req_seconds_bucket{stage="llm",le="1.0"} 2' in text  # cumulative
+    assert 'req_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'req_seconds_count{stage="llm"} 3' in text
+    assert '# TYPE queue_depth gauge\nqueue_depth{stage="embed"} 3' in text
+
+
+def test_metrics_endpoint_after_ask():
+    client = TestClient(app)
+    doc = "Montreal is a city in Quebec. It is known for its bagels and jazz festival."
+    assert client.post("/ask", json={"question": "What is Montreal known for?", "document_text": doc}).status_code == 200
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    for stage in ("chunk", "embed_docs", "embed_query", "score"):
+        assert f'trustcite_stage_seconds_count{{stage="{stage}"}}' in r.text
+    assert "trustcite_answers_total{endpoint=\"ask\"" in r.text
+    assert 'trustcite_cache_misses_total{cache="doc_index"}' in r.text
@@ -0,0 +1,42 @@
+from rag.answering import build_cited_prompt
+from rag.chunking import Chunk
+from rag.prompt_budget import estimate_tokens, num_ctx_for, pack_evidence
+from rag.retrieval import Retrieved
+
+
+def _retrieved(n, words=150):
+    return [
+        Retrieved(chunk=Chunk(chunk_id=f"c{i:04d}", start=0, end=0, text=" ".join(["evidence"] * words)), score=1.0 - i / 10)
+        for i in range(n)
+    ]
+
+
+def test_pack_keeps_rank_order_trims_then_drops():
+    ret = _retrieved(5)
+    one = estimate_tokens(" ".join(["evidence"] * 150))
+    packed = pack_evidence(ret, budget_tokens=2 * (one + 12) + 60, max_chars_per_chunk=10_000)
+    assert [r.chunk.chunk_id for r, _ in packed] == ["c0000", "c0001", "c0002"]
+    assert packed[2][1].endswith("…") and estimate_tokens(packed[2][1]) <= 60
+
+    # the top chunk always survives, even over budget
+    assert len(pack_evidence(ret, budget_tokens=5)) == 1
+
+
+def test_budgeted_prompt_fits_and_num_ctx_is_stable():
+    ret = _retrieved(5, words=400)
+    full = build_cited_prompt("What is it?", ret)
+    small = build_cited_prompt("What is it?", ret, budget_tokens=600)
+    assert estimate_tokens(small) <= 600 < estimate_tokens(full)
+    assert "c0000" in small and "c0004" not in small
+    assert num_ctx_for(small, budget_tokens=600) == num_ctx_for("short", budget_tokens=600) == 2048
+
+
+def test_estimate_is_conservative_for_cjk_and_digits():
+    cjk = "東京は日本の首都であり、世界で最も人口の多い都市圏の一つです。"
+    assert estimate_tokens(cjk) >= len(cjk)  # BPE gives CJK about a token per character, often more
+    iban = "IBAN DE89370400440532013000, ref 8847201938, total 1938472.55"
+    assert estimate_tokens(iban) >= len(iban) // 2
+    assert estimate_tokens("x" * 400) >= 100  # never below a token per 4 characters
+
+    # the default budget keeps num_ctx at 4096: 25% headroom over the estimate
+    assert num_ctx_for("short", budget_tokens=1536) == 4096
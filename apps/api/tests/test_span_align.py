@@ -0,0 +1,95 @@
+from rag.span_align import ChunkSpanIndex, align_span
+
+CHUNK = (
+    "The Supplier shall deliver all Goods to the Delivery Point no later than thirty (30) days after "
+    "the Order Date. Risk in the Goods passes to the Customer on delivery. Title passes on payment in "
+    "full. Either party may terminate this Agreement on ninety (90) days' written notice. The Customer "
+    "shall pay each invoice within forty-five (45) days of receipt."
+)
+
+
+def test_verbatim_sentence_gets_tight_high_scoring_span():
+    sent = "Either party may terminate this Agreement on ninety (90) days' written notice."
+    start, end, score = align_span(sent, CHUNK)
+    assert CHUNK.index("Either") >= start and CHUNK.index("notice.") + len("notice") <= end
+    assert end - start < len(sent) + 100
+    assert score >= 0.5
+
+
+def test_unrelated_sentence_scores_low_and_prebuilt_index_matches():
+    assert align_span("Vancouver is known for its film industry.", CHUNK)[2] < 0.40
+    idx = ChunkSpanIndex(CHUNK)
+    sent = "Risk passes to the Customer on delivery."
+    assert align_span(sent, CHUNK, index=idx) == align_span(sent, CHUNK)
+    assert align_span("", CHUNK) is None
+
+
+VANCOUVER = (
+    "Vancouver is a major city in western Canada, located in the Lower Mainland region of British Columbia. "
+    "As the most populous city in the province, the 2021 census recorded 662,248 people in the city. "
+    "Vancouver is one of the most ethnically and linguistically diverse cities in Canada. "
+    "It is known for its film industry, and it has been called Hollywood North. "
+    "The city is consistently named as one of the top five worldwide cities for livability and quality of life. "
+    "The Port of Vancouver is the largest port in Canada and the fourth largest in North America by tonnage. "
+    "Vancouver has hosted many international conferences and events, including the 2010 Winter Olympics."
+)
+PLANTS = (
+    "Photosynthesis is the process by which green plants use sunlight to synthesize foods from carbon dioxide "
+    "and water. It generally involves the green pigment chlorophyll and generates oxygen as a by-product. "
+    "In most plants the process takes place in the chloroplasts of leaf cells. The light-dependent reactions "
+    "occur in the thylakoid membranes, while the Calvin cycle takes place in the stroma."
+)
+
+# (chunk, sentence, supported, score of the previous SequenceMatcher aligner)
+CASES = [
+    (VANCOUVER, "It is known for its film industry.", True, 0.468),
+    (VANCOUVER, "Vancouver is known for its film industry and has been called Hollywood North.", True, 0.308),
+    (VANCOUVER, "The 2021 census recorded 662,248 people in the city.", True, 0.375),
+    (VANCOUVER, "Vancouver hosted the 2010 Winter Olympics.", True, 0.101),
+    (VANCOUVER, "The Port of Vancouver is the largest port in Canada.", True, 0.010),
+    (VANCOUVER, "Vancouver is one of the most diverse cities in Canada.", True, 0.104),
+    (VANCOUVER, "The port of Vancouver is the busiest in the world.", False, 0.014),
+    (VANCOUVER, "It is known for its wine and its skiing resorts.", False, 0.594),
+    (VANCOUVER, "The mayor of the city is elected every four years.", False, 0.003),
+    (VANCOUVER, "Photosynthesis takes place in the chloroplasts.", False, 0.409),
+    (CHUNK, "Either party may terminate this Agreement on ninety (90) days' written notice.", True, 0.664),
+    (CHUNK, "The Customer shall pay each invoice within forty-five (45) days of receipt.", True, 0.350),
+    (CHUNK, "Risk passes to the Customer on delivery.", True, 0.351),
+    (CHUNK, "The Supplier must deliver the Goods within thirty (30) days after the Order Date.", True, 0.276),
+    (CHUNK, "The Supplier is liable for all indirect and consequential losses.", False, 0.397),
+    (CHUNK, "This Agreement is governed by the laws of England and Wales.", False, 0.299),
+    (CHUNK, "It is known for its film industry.", False, 0.281),
+    (PLANTS, "In most plants the process takes place in the chloroplasts of leaf cells.", True, 0.358),
+    (PLANTS, "Photosynthesis generates oxygen as a by-product.", True, 0.260),
+    (PLANTS, "The Calvin cycle takes place in the stroma.", True, 0.354),
+    (PLANTS, "Plants use sunlight to make food from carbon dioxide and water.", True, 0.566),
+    (PLANTS, "It is the process by which animals digest food in the stomach.", False, 0.465),
+    (PLANTS, "The process is one of the most important in the world.", False, 0.026),
+    # recombined facts: words of the chunk, taken from different facts
+    (CHUNK, "Title passes to the Customer on delivery.", False, 0.290),
+    (CHUNK, "The Customer shall pay each invoice within ninety (90) days of receipt.", False, 0.108),
+    (CHUNK, "Risk passes to the Customer on payment in full.", False, 0.443),
+    (CHUNK, "Either party may terminate this Agreement on thirty (30) days written notice.", False, 0.189),
+    (VANCOUVER, "Vancouver is the largest city in Canada.", False, 0.055),
+    (VANCOUVER, "Vancouver hosted the 2021 Winter Olympics.", False, 0.062),
+    (VANCOUVER, "Vancouver is the most populous city in Canada.", False, 0.392),
+    (PLANTS, "The Calvin cycle occurs in the thylakoid membranes.", False, 0.497),
+    (PLANTS, "The light-dependent reactions take place in the stroma.", False, 0.037),
+]
+VERIFY_MIN = 0.40
+# Lexical limit: two clauses of one chunk sentence recombined in order.
+KNOWN_MISSES = {"The light-dependent reactions take place in the stroma."}
+
+
+def test_accept_decisions_agree_with_previous_aligner_where_it_was_right():
+    legacy_right = [c for c in CASES if (c[3] >= VERIFY_MIN) == c[2] and c[1] not in KNOWN_MISSES]
+    assert len(legacy_right) >= 8
+    for chunk, sent, _, legacy in legacy_right:
+        assert (align_span(sent, chunk)[2] >= VERIFY_MIN) == (legacy >= VERIFY_MIN), sent
+
+
+def test_stopwords_neither_support_a_claim_nor_hide_a_supported_one():
+    wrong = {sent for chunk, sent, supported, _ in CASES if (align_span(sent, chunk)[2] >= VERIFY_MIN) != supported}
+    assert wrong == KNOWN_MISSES
+    # only function words shared with the chunk: no support
+    assert align_span("It is in the one of the things that are there.", VANCOUVER)[2] < VERIFY_MIN
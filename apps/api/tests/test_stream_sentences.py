@@ -0,0 +1,12 @@
+from rag.citations import split_complete_sentences, split_sentences
+
+
+def test_split_complete_sentences_matches_batch_split():
+    text = "Vancouver is coastal [c0000]. It has films [c0001]\nToronto is big. [c0002]\n\nDone [c0003]"
+    for step in (1, 3, 7):
+        out, pending = [], ""
+        for i in range(0, len(text), step):
+            done, pending = split_complete_sentences(pending + text[i:i + step])
+            out.extend(done)
+        out.extend(split_sentences(pending))
+        assert out == split_sentences(text)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from rag.aio import run_cpu
+from rag.tracing import JsonlSpanSink, span, start_recording
+
+
+def test_spans_nest_across_tasks_and_cpu_pool():
+    def cpu_work():
+        with span("verify"):
+            pass
+
+    async def run():
+        rec = start_recording("ask")
+        with span("generate", model="stub"):
+            with span("llm"):
+                await asyncio.sleep(0.001)
+            await run_cpu(cpu_work)
+        await asyncio.gather(asyncio.create_task(_child()))
+        return rec
+
+    async def _child():
+        with span("task"):
+            pass
+
+    spans = {s["name"]: s for s in asyncio.run(run()).export()}
+    assert spans["generate"]["parent"] is None and spans["generate"]["attrs"] == {"model": "stub"}
+    assert spans["llm"]["parent"] == spans["generate"]["id"]
+    assert spans["verify"]["parent"] == spans["generate"]["id"]
+    assert spans["task"]["parent"] is None
+    assert spans["llm"]["dur_us"] >= 1000
+    assert spans["generate"]["dur_us"] >= spans["llm"]["dur_us"]
+
+
+def test_span_is_noop_without_recording(tmp_path):
+    with span("nothing"):
+        pass
+
+    sink = JsonlSpanSink(str(tmp_path / "traces" / "spans.jsonl"))
+
+    async def run():
+        rec = start_recording("ask")
+        with span("retrieve"):
+            pass
+        sink.write(rec, abstained=False)
+
+    asyncio.run(run())
+    sink.close()
+    line = json.loads((tmp_path / "traces" / "spans.jsonl").read_text().strip())
+    assert line["name"] == "ask" and line["abstained"] is False
+    assert [s["name"] for s in line["spans"]] == ["retrieve"]
+
+
+def test_sink_writes_on_its_own_thread_and_drops_when_full(tmp_path, monkeypatch):
+    import threading
+
+    path = tmp_path / "spans.jsonl"
+    writers = set()
+    real_open = open
+
+    def spy_open(*args, **kwargs):
+        if str(args[0]) == str(path):
+            writers.add(threading.current_thread().name)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", spy_open)
+    sink = JsonlSpanSink(str(path))
+    for i in range(50):
+        sink.write(start_recording(f"r{i}"))
+    sink.close()
+    assert [json.loads(x)["name"] for x in path.read_text().splitlines()] == [f"r{i}" for i in range(50)]
+    assert writers == {"trustcite-trace-writer"}
+
+    full = JsonlSpanSink(str(tmp_path / "other.jsonl"), max_pending=1)
+    full._thread = threading.Thread(target=lambda: None)  # writer never drains
+    full.write(start_recording("a"))
+    full.write(start_recording("b"))
+    assert full.dropped == 1
@@ -0,0 +1,34 @@
+from rag import verify
+from rag.chunking import Chunk
+from rag.verify import shutdown_verify_executor, verify_all
+
+
+def _case():
+    texts = [
+        "The Supplier shall deliver all Goods within thirty (30) days after the Order Date.",
+        "Either party may terminate this Agreement on ninety (90) days' written notice.",
+        "The Customer shall pay each invoice within forty-five (45) days of receipt.",
+    ]
+    chunks = {f"c{i:04d}": Chunk(chunk_id=f"c{i:04d}", start=100 * i, end=100 * i + len(t), text=t) for i, t in enumerate(texts)}
+    enforced = [
+        ("The Supplier delivers the Goods within thirty days after the Order Date.", [("c0000", 0, 0), ("c0001", 0, 0)]),
+        ("Either party may terminate on ninety days' written notice.", [("c0001", 0, 0), ("c0009", 0, 0)]),
+        ("Vancouver is known for its film industry.", [("c0002", 0, 0)]),
+        ("Invoices are paid within forty-five (45) days of receipt.", [("c0002", 0, 0), ("c0000", 0, 0)]),
+    ]
+    return enforced, chunks
+
+
+def test_process_pool_matches_inline(monkeypatch):
+    enforced, chunks = _case()
+    inline = verify_all(enforced, chunks_by_id=chunks)
+
+    monkeypatch.setenv("TRUSTCITE_VERIFY_WORKERS", "2")
+    try:
+        assert verify.verify_executor() is not None
+        pooled = verify_all(enforced, chunks_by_id=chunks, min_parallel_jobs=1)
+    finally:
+        shutdown_verify_executor()
+
+    assert pooled == inline
+    assert inline[1] == 1  # the unrelated sentence is dropped